@@ -1,29 +1,117 @@
 __version__ = "2025.09.06"
 
+import time
+_STARTUP_T0 = time.perf_counter()
+
 import tkinter as tk
 from tkinter import simpledialog, filedialog, messagebox, ttk
 import tkinter.font as tkfont
 import json
-import requests
+import zlib
+import hashlib
+import importlib
 import shutil
-import pandas as pd
-import numpy as np
+import tempfile
 import os
 import sys
-import gspread
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas as rl_canvas
 import subprocess
-from gspread_formatting import format_cell_range, CellFormat, Color, TextFormat
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from PIL import Image, ImageTk
-from collections import defaultdict
+import csv
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import datetime
+from collections import defaultdict, deque
+from array import array
+import heapq
+import threading
+import queue
+import sqlite3
+
+
+# ====== Lazy Imports ======
+# The heavy third-party packages are only needed once a panel is open, a BOM
+# is exported or a catalogue is imported, so they are bound to LazyModule
+# proxies that import the real module on first attribute access. The
+# welcome screen starts preload_modules() on a background thread so they
+# are usually warm by the time the designer needs them.
+# --profile-startup prints where the start-up time went.
+_startup_marks = []
+_lazy_import_times = []
+
+
+def startup_mark(label):
+    _startup_marks.append((label, time.perf_counter() - _STARTUP_T0))
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Its own attributes are underscored so they can't shadow the module's
+    (numpy has a load(), for one).
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _lazy_load(self):
+        if self._module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._name)
+            _lazy_import_times.append((self._name, time.perf_counter() - start, threading.current_thread().name))
+            self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._lazy_load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}{'' if self._module is None else ' (loaded)'}>"
+
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+Image = LazyModule("PIL.Image")
+ImageTk = LazyModule("PIL.ImageTk")
+requests = LazyModule("requests")
+gspread = LazyModule("gspread")
+gspread_formatting = LazyModule("gspread_formatting")
+google_credentials = LazyModule("google.oauth2.credentials")
+google_auth_requests = LazyModule("google.auth.transport.requests")
+google_auth_exceptions = LazyModule("google.auth.exceptions")
+oauth_flow = LazyModule("google_auth_oauthlib.flow")
+
+# in the order the designer tends to need them
+PRELOAD_MODULES = [np, pd, Image, ImageTk, requests, gspread, gspread_formatting,
+                   google_credentials, google_auth_requests, google_auth_exceptions, oauth_flow]
+
+
+def preload_modules():
+    def worker():
+        for module in PRELOAD_MODULES:
+            try:
+                module._lazy_load()
+            except Exception as e:
+                print("Preload failed:", module, e)
+    threading.Thread(target=worker, name="preload", daemon=True).start()
+
+
+def startup_report():
+    lines = ["Start-up profile (seconds since launch):"]
+    previous = 0.0
+    for label, at in _startup_marks:
+        lines.append(f"  {at:8.3f}  (+{at - previous:.3f})  {label}")
+        previous = at
+    if _lazy_import_times:
+        lines.append("Deferred imports:")
+        for name, took, thread in _lazy_import_times:
+            lines.append(f"  {took:8.3f}  {name}  [{thread}]")
+    return "\n".join(lines)
+# ====== End Lazy Imports ======
 
 
 # ====== Persisted Version Helpers (Injected) ======
-import os, sys, time, shutil, requests
+import os, sys, time, shutil
 
 APPDATA_FOLDER = os.path.join(os.environ.get("APPDATA") or os.path.expanduser("~"), "PanelDesigner")
 os.makedirs(APPDATA_FOLDER, exist_ok=True)
@@ -38,20 +126,9 @@ def get_installed_version():
 
 def set_installed_version(v):
     try:
-        with open(VERSION_FILE, "w", encoding="utf-8") as f:
-            f.write(str(v))
+        atomic_write(VERSION_FILE, lambda f: f.write(str(v)))
     except Exception:
         pass
-
-def fetch_remote_version():
-    try:
-        url = "https://raw.githubusercontent.com/hsspcreations/panel-designer-updates/refs/heads/main/version.txt"
-        r = requests.get(url, timeout=6)
-        if r.status_code == 200:
-            return r.text.strip()
-    except Exception:
-        return None
-    return None
 # ====== End Injected Helpers ======
 
 
@@ -60,42 +137,310 @@ APPDATA_FOLDER = os.path.join(os.environ.get("APPDATA") or os.path.expanduser("~
 PANELS_FOLDER = os.path.join(APPDATA_FOLDER, "panels")
 os.makedirs(PANELS_FOLDER, exist_ok=True)
 TOKEN_FILE = os.path.join(APPDATA_FOLDER, "token.json")
+PANEL_INDEX_FILE = os.path.join(APPDATA_FOLDER, "panel_index.json")
+BOM_CACHE_FILE = os.path.join(APPDATA_FOLDER, "bom_cache.json")
+CATALOGUE_DB_FILE = os.path.join(APPDATA_FOLDER, "catalogue.db")
+PROJECTS_FILE = os.path.join(APPDATA_FOLDER, "projects.json")
+BUSBAR_CACHE_FILE = os.path.join(APPDATA_FOLDER, "busbar_data.npz")
+
+
+# ====== Background Helpers ======
+# Files shared between the Tk thread, worker threads and CLI worker
+# processes are written to a unique temp file next to the target and moved
+# into place with os.replace, so readers never see a half-written file and
+# two writers never share a temp path. Long jobs run on a worker thread
+# behind run_with_progress, which owns the dialog, the queue and the poll loop.
+def atomic_write(path, write, mode="w"):
+    """Call write(f) on a temp file in path's folder, then replace path with it."""
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_file(path, data, **dump_args):
+    atomic_write(path, lambda f: json.dump(data, f, **dump_args))
+
+
+def run_with_progress(parent, title, status, work, on_done, on_error, on_close=None):
+    """Run work(report, cancel) on a worker thread behind a progress dialog with a Cancel button.
+
+    work calls report(fraction, text=None) to move the bar (a fraction of
+    None pulses it) and optionally replace the status text. Once Cancel is
+    pressed the job ends as cancelled, whatever work returns or raises.
+    When it ends the dialog closes, on_close() runs, then on_done(result) or
+    on_error(exc) on the Tk thread. Returns the cancel Event.
+    """
+    dlg = tk.Toplevel(parent)
+    dlg.title(title)
+    dlg.resizable(False, False)
+    if parent is not None:
+        dlg.transient(parent)
+    status_var = tk.StringVar(value=status)
+    tk.Label(dlg, textvariable=status_var, anchor="w", justify="left").pack(fill=tk.X, padx=10, pady=(10, 5))
+    bar = ttk.Progressbar(dlg, length=300, mode="determinate", maximum=100)
+    bar.pack(padx=10, pady=5)
+    cancel = threading.Event()
+    ttk.Button(dlg, text="Cancel", command=cancel.set).pack(pady=(5, 10))
+    dlg.protocol("WM_DELETE_WINDOW", cancel.set)
+
+    events = queue.Queue()
+
+    def worker():
+        try:
+            result = work(lambda fraction, text=None: events.put(("progress", (fraction, text))), cancel)
+            events.put(("cancelled", None) if cancel.is_set() else ("done", result))
+        except Exception as e:
+            events.put(("cancelled", None) if cancel.is_set() else ("error", e))
+
+    def poll():
+        try:
+            while True:
+                kind, payload = events.get_nowait()
+                if kind == "progress":
+                    fraction, text = payload
+                    if fraction is None:
+                        bar.configure(mode="indeterminate")
+                        bar.step(5)
+                    else:
+                        bar.configure(mode="determinate", value=fraction * 100)
+                    if text:
+                        status_var.set(text)
+                    continue
+                dlg.destroy()
+                if on_close is not None:
+                    on_close()
+                if kind == "error":
+                    on_error(payload)
+                elif kind == "done":
+                    on_done(payload)
+                return
+        except queue.Empty:
+            pass
+        if cancel.is_set():
+            status_var.set("Cancelling...")
+        dlg.after(100, poll)
+
+    threading.Thread(target=worker, daemon=True).start()
+    dlg.after(100, poll)
+    return cancel
+# ====== End Background Helpers ======
+
+
+# ====== Updater ======
+# The version check runs on a background thread at startup and is a
+# conditional GET (ETag / If-Modified-Since) against the last answer kept in
+# UPDATE_CHECK_FILE. The update itself streams main.py to a .part file
+# (resuming with a Range request if a previous download was cut off),
+# verifies it against main.py.sha256 when the server has one (and always
+# checks that it compiles), then swaps it in with os.replace. The base URL
+# can be pointed at a local HTTP server through PANEL_DESIGNER_UPDATE_URL.
+UPDATE_BASE_URL = os.environ.get(
+    "PANEL_DESIGNER_UPDATE_URL",
+    "https://raw.githubusercontent.com/hsspcreations/panel-designer-updates/refs/heads/main")
+UPDATE_CHECK_FILE = os.path.join(APPDATA_FOLDER, "update_check.json")
+UPDATE_CHUNK_SIZE = 64 * 1024
+_update_check = {"version": None, "done": threading.Event()}
+
+
+class UpdateCancelled(Exception):
+    pass
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def check_remote_version(base_url=None, timeout=6):
+    """Latest published version, or None. Asks the server only whether it changed since the last check."""
+    cached = _read_json(UPDATE_CHECK_FILE)
+    headers = {}
+    if cached.get("version"):
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        r = requests.get(f"{base_url or UPDATE_BASE_URL}/version.txt", headers=headers, timeout=timeout)
+    except Exception:
+        return cached.get("version")  # offline: the last known answer is the best we have
+    if r.status_code == 304:
+        return cached.get("version")
+    if r.status_code != 200:
+        return None
+    version = r.text.strip()
+    try:
+        write_json_file(UPDATE_CHECK_FILE, {"version": version, "etag": r.headers.get("ETag"),
+                                            "last_modified": r.headers.get("Last-Modified"), "checked": time.time()})
+    except Exception as e:
+        print("Could not write", UPDATE_CHECK_FILE, e)
+    return version
+
+
+def start_update_check(base_url=None):
+    """Run the version check on a background thread; the answer lands in _update_check."""
+    def worker():
+        _update_check["version"] = check_remote_version(base_url)
+        _update_check["done"].set()
+    threading.Thread(target=worker, daemon=True).start()
+
+
+def update_available():
+    """True/False once the background check is done, None while it is still running."""
+    if not _update_check["done"].is_set():
+        return None
+    remote_ver = _update_check["version"]
+    return bool(remote_ver) and str(remote_ver) > str(get_installed_version())
+
+
+def _uncached(url):
+    """url with a cache-busting query, so the CDN in front of raw.githubusercontent can't serve a stale copy."""
+    return f"{url}?t={int(time.time())}"
+
+
+def _expected_sha256(base_url, timeout):
+    try:
+        r = requests.get(_uncached(f"{base_url}/main.py.sha256"), headers={"Cache-Control": "no-cache"}, timeout=timeout)
+    except Exception:
+        return None
+    if r.status_code != 200 or not r.text.strip():
+        return None
+    return r.text.split()[0].lower()
+
+
+def _download_part(base_url, part_path, meta_path, progress, cancel, timeout):
+    """Fetch main.py into part_path, continuing an earlier partial download if possible.
+
+    Returns True if bytes already in part_path were kept.
+    """
+    meta = _read_json(meta_path)
+    have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+    # identity: Content-Length and Range offsets must count the bytes written to the .part file
+    headers = {"Accept-Encoding": "identity", "Cache-Control": "no-cache"}
+    if have and meta.get("validator"):
+        # If-Range: the server only continues the file if it is still the same version
+        headers["Range"] = f"bytes={have}-"
+        headers["If-Range"] = meta["validator"]
+    # the query only defeats caches; If-Range still compares the file's own validator
+    with requests.get(_uncached(f"{base_url}/main.py"), headers=headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 416:
+            # nothing past `have`: the .part file is already complete (verification decides)
+            if progress:
+                progress(have, have)
+            return True
+        if r.status_code == 206:
+            mode, resumed = "ab", True
+        elif r.status_code == 200:
+            mode, have, resumed = "wb", 0, False
+            write_json_file(meta_path, {"validator": r.headers.get("ETag") or r.headers.get("Last-Modified")})
+        else:
+            raise ValueError(f"Could not download the update (HTTP {r.status_code}).")
+        length = r.headers.get("Content-Length")
+        total = have + int(length) if length else None
+        with open(part_path, mode) as f:
+            for chunk in r.iter_content(UPDATE_CHUNK_SIZE):
+                if cancel is not None and cancel.is_set():
+                    raise UpdateCancelled()  # the .part file stays for a resumed download
+                f.write(chunk)
+                have += len(chunk)
+                if progress:
+                    progress(have, total)
+    return resumed
+
+
+def _discard_part(part_path, meta_path):
+    for path in (part_path, meta_path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
 
-def update_software():
-    remote_ver = fetch_remote_version()
-    if not remote_ver:
+def _verify_part(part_path, target, base_url, timeout):
+    with open(part_path, "rb") as f:
+        source = f.read()
+    expected = _expected_sha256(base_url, timeout)
+    if expected and hashlib.sha256(source).hexdigest() != expected:
+        raise ValueError("The downloaded update does not match its published checksum.")
+    try:
+        compile(source, target, "exec")
+    except SyntaxError as e:
+        raise ValueError(e) from e
+
+
+def download_update(target="main.py", base_url=None, progress=None, cancel=None, timeout=15):
+    """Download and verify the new main.py next to target, then atomically replace target.
+
+    progress(done, total) is called as chunks arrive (total may be None).
+    Raises UpdateCancelled if cancel is set, ValueError if verification fails.
+    A kept .part file that does not verify is thrown away and the download
+    starts over once.
+    """
+    base_url = base_url or UPDATE_BASE_URL
+    part_path = f"{target}.part"
+    meta_path = f"{part_path}.json"
+    resumed = _download_part(base_url, part_path, meta_path, progress, cancel, timeout)
+    try:
+        _verify_part(part_path, target, base_url, timeout)
+    except ValueError as e:
+        _discard_part(part_path, meta_path)
+        if not resumed:
+            raise ValueError(f"The downloaded update is damaged: {e}") from e
+        _download_part(base_url, part_path, meta_path, progress, cancel, timeout)
         try:
-            from tkinter import messagebox
-            messagebox.showerror("Update", "Could not fetch remote version.")
-        except Exception: pass
-        return
+            _verify_part(part_path, target, base_url, timeout)
+        except ValueError as e:
+            _discard_part(part_path, meta_path)
+            raise ValueError(f"The downloaded update is damaged: {e}") from e
+
+    if os.path.exists(target):
+        shutil.copy(target, "main_backup.py")  # backup old version
+    os.replace(part_path, target)
+    try:
+        os.remove(meta_path)
+    except OSError:
+        pass
+
+
+def update_software(parent=None):
     current_ver = get_installed_version()
-    if str(remote_ver) <= str(current_ver):
-        try:
-            from tkinter import messagebox
+
+    def work(report, cancel):
+        # the startup check normally has the answer; otherwise ask here, off the Tk thread
+        remote_ver = _update_check["version"] if _update_check["done"].is_set() else check_remote_version()
+        if not remote_ver:
+            raise ValueError("Could not fetch remote version.")
+        if str(remote_ver) <= str(current_ver):
+            return None
+        report(0, f"Current version: {__version__}\nDownloading version {remote_ver}...")
+        download_update(progress=lambda done, total: report(done / total if total else None), cancel=cancel)
+        return remote_ver
+
+    def on_done(remote_ver):
+        if remote_ver is None:
             messagebox.showinfo("Update", "Already up to date.")
-        except Exception: pass
-        return
+            return
+        set_installed_version(remote_ver)
+        messagebox.showinfo("Update Complete", "Software updated successfully. Restarting now...")
+        os.execl(sys.executable, sys.executable, *sys.argv)  # restart app
 
-    import time
-    messagebox.showinfo("Updater", f"Current version: {__version__}\nDownloading latest version...")
-    UPDATE_URL = "https://raw.githubusercontent.com/hsspcreations/panel-designer-updates/refs/heads/main/main.py"
-    try:
-        url = f"{UPDATE_URL}?t={int(time.time())}"  # bypass cache
-        response = requests.get(url, stream=True)
-        if response.status_code == 200:
-            backup_path = "main_backup.py"
-            if os.path.exists("main.py"):
-                shutil.copy("main.py", backup_path)  # backup old version
-            with open("main.py", "wb") as f:
-                f.write(response.content)
-            messagebox.showinfo("Update Complete", "Software updated successfully. Restarting now...")
-            os.execl(sys.executable, sys.executable, *sys.argv)  # restart app
-        else:
-            messagebox.showerror("Update Failed", "Could not download the update.")
-    except Exception as e:
-        messagebox.showerror("Error", f"Update failed: {e}")
+    run_with_progress(parent, "Updater", f"Current version: {__version__}\nChecking for updates...", work,
+                      on_done, lambda e: messagebox.showerror("Update Failed", f"Update failed: {e}"))
+# ====== End Updater ======
 
 
 def resource_path(relative_path):
@@ -124,6 +469,1749 @@ SCOPES = [
 ]
 
 
+# ====== Panel Index ======
+# Persistent manifest of the panels folder so project lookups don't have to
+# json.load every panel file. Entries are keyed by filename and revalidated
+# with (mtime, size); only new or changed files are parsed again.
+#
+# Panels are saved as .panel files: one line of JSON header (format version,
+# project info, counts, content hash and the BOM part summary) followed by
+# the zlib-compressed compact JSON body. Everything the index and the
+# project lists need comes from the header, so the body is only inflated
+# when a panel is opened or its busbars have to be priced. Older .json
+# panels are still read as-is; --migrate-panels converts them in bulk.
+PANEL_INDEX_VERSION = 2
+PANEL_FORMAT_VERSION = 1
+PANEL_EXT = ".panel"
+LEGACY_PANEL_EXT = ".json"
+PANEL_BACKUP_FOLDER = os.path.join(PANELS_FOLDER, "legacy_json")
+_panel_index_cache = None
+# Guards _panel_index_cache and _bom_cache, which the BOM job reads and
+# updates on its worker thread while the designer may be saving a panel.
+# Both dicts are replaced rather than edited in place, so a snapshot handed
+# out by load_panel_index stays valid.
+_cache_lock = threading.RLock()
+
+
+def content_hash(raw):
+    return hashlib.sha1(raw).hexdigest()
+
+
+def panel_body(panel_data):
+    """The saved part of a panel, minus project_info (kept in the header) and stale canvas ids."""
+    body = {k: v for k, v in panel_data.items() if k != "project_info"}
+    body["busbars"] = [{k: v for k, v in b.items() if k != "id"} for b in panel_data.get("busbars", []) or []]
+    return body
+
+
+def panel_header(panel_data, panel_hash):
+    parts, categories = panel_part_rows(panel_data)
+    return {
+        "format": "panel",
+        "version": PANEL_FORMAT_VERSION,
+        "project_info": panel_data.get("project_info", {}) or {},
+        "summary": panel_summary(panel_data),
+        "hash": panel_hash,
+        "bom": {"parts": parts, "categories": categories},
+    }
+
+
+def encode_panel(panel_data):
+    """Return (header, bytes) for panel_data in the .panel format."""
+    raw = json.dumps(panel_body(panel_data), separators=(",", ":")).encode("utf-8")
+    header = panel_header(panel_data, content_hash(raw))
+    return header, json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n" + zlib.compress(raw, 6)
+
+
+def write_panel_file(path, panel_data):
+    """Atomically write panel_data to path and return its header."""
+    header, data = encode_panel(panel_data)
+    atomic_write(path, lambda f: f.write(data), mode="wb")
+    return header
+
+
+def _parse_panel_header(line):
+    header = json.loads(line)
+    if not isinstance(header, dict) or header.get("format") != "panel":
+        raise ValueError("not a panel file")
+    if header.get("version", 0) > PANEL_FORMAT_VERSION:
+        raise ValueError(f"panel format version {header.get('version')} is newer than this program")
+    return header
+
+
+def read_panel_header(path):
+    """Read only the header line of a .panel file."""
+    with open(path, "rb") as f:
+        return _parse_panel_header(f.readline())
+
+
+def read_panel_file(path):
+    if not path.endswith(PANEL_EXT):
+        with open(path, "r") as f:
+            return json.load(f)
+    with open(path, "rb") as f:
+        header = _parse_panel_header(f.readline())
+        panel_data = json.loads(zlib.decompress(f.read()))
+    panel_data["project_info"] = header.get("project_info", {}) or {}
+    return panel_data
+
+
+def panel_name_of(fname):
+    return os.path.splitext(fname)[0]
+
+
+def panel_filename(name, index=None):
+    """Filename of panel `name`, preferring the .panel file over a legacy .json one."""
+    fname = name + PANEL_EXT
+    if index is not None:
+        return fname if fname in index or name + LEGACY_PANEL_EXT not in index else name + LEGACY_PANEL_EXT
+    if os.path.exists(os.path.join(PANELS_FOLDER, fname)):
+        return fname
+    legacy = name + LEGACY_PANEL_EXT
+    return legacy if os.path.exists(os.path.join(PANELS_FOLDER, legacy)) else fname
+
+
+def legacy_panel_conflict(name):
+    """True if a panel's .json file was modified after its .panel file was written."""
+    legacy = os.path.join(PANELS_FOLDER, name + LEGACY_PANEL_EXT)
+    current = os.path.join(PANELS_FOLDER, name + PANEL_EXT)
+    try:
+        return os.path.getmtime(legacy) > os.path.getmtime(current)
+    except OSError:
+        return False
+
+
+def _backup_path(name):
+    # Never overwrite an earlier backup: a second copy of the same panel gets -2, -3, ...
+    path = os.path.join(PANEL_BACKUP_FOLDER, name + LEGACY_PANEL_EXT)
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(PANEL_BACKUP_FOLDER, f"{name}-{n}{LEGACY_PANEL_EXT}")
+    return path
+
+
+def retire_legacy_panel(name):
+    """Move a panel's old .json file into PANEL_BACKUP_FOLDER once its .panel file exists.
+
+    A .json that is newer than the .panel is left in place (see
+    legacy_panel_conflict), since it may hold edits the .panel lacks.
+    """
+    legacy = os.path.join(PANELS_FOLDER, name + LEGACY_PANEL_EXT)
+    if not os.path.exists(legacy) or legacy_panel_conflict(name):
+        return False
+    os.makedirs(PANEL_BACKUP_FOLDER, exist_ok=True)
+    os.replace(legacy, _backup_path(name))
+    return True
+
+
+def panel_summary(panel_data):
+    cubicles = panel_data.get("cubicles", []) or []
+    compartments = 0
+    filled = 0
+    for cub in cubicles:
+        for comp in cub.get("compartments", []) or []:
+            compartments += 1
+            filled += sum(1 for sec in comp.get("sections", []) or [] if sec.get("item"))
+    return {
+        "panel_depth": panel_data.get("panel_depth"),
+        "cubicles": len(cubicles),
+        "compartments": compartments,
+        "filled_sections": filled,
+        "busbars": len(panel_data.get("busbars", []) or []),
+    }
+
+
+def _index_entry(stat, panel_hash, project_info, summary):
+    return {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": panel_hash,
+            "project_info": project_info, "summary": summary}
+
+
+def _read_index_entry(path, stat):
+    if path.endswith(PANEL_EXT):
+        try:
+            header = read_panel_header(path)
+            return _index_entry(stat, header.get("hash"), header.get("project_info", {}) or {}, header.get("summary"))
+        except Exception:
+            return _index_entry(stat, None, None, None)  # remembered as unreadable until the file changes
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        panel_data = json.loads(raw)
+        if isinstance(panel_data, dict) and isinstance(panel_data.get("project_info", {}), dict):
+            return _index_entry(stat, content_hash(raw), panel_data.get("project_info", {}) or {},
+                                panel_summary(panel_data))
+    except Exception:
+        pass
+    return _index_entry(stat, None, None, None)
+
+
+def _read_index_file():
+    try:
+        with open(PANEL_INDEX_FILE, "r") as f:
+            data = json.load(f)
+        if data.get("version") == PANEL_INDEX_VERSION:
+            return data.get("panels", {})
+    except Exception:
+        pass
+    return {}
+
+
+def _write_index_file(entries):
+    try:
+        write_json_file(PANEL_INDEX_FILE, {"version": PANEL_INDEX_VERSION, "panels": entries})
+    except Exception as e:
+        print("Could not write panel index:", e)
+
+
+def load_panel_index():
+    """Return {filename: entry} for every panel file, re-reading only files whose mtime/size changed.
+
+    Panel files are read without holding _cache_lock; the lock is only taken
+    to swap the new manifest in, keeping any entry update_panel_index
+    recorded while the folder was being scanned.
+    """
+    global _panel_index_cache
+    os.makedirs(PANELS_FOLDER, exist_ok=True)
+    with _cache_lock:
+        if _panel_index_cache is None:
+            _panel_index_cache = _read_index_file()
+        cached = _panel_index_cache
+
+    entries = {}
+    changed = False
+    with os.scandir(PANELS_FOLDER) as it:
+        for entry in it:
+            if not entry.name.endswith((PANEL_EXT, LEGACY_PANEL_EXT)) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            old = cached.get(entry.name)
+            if old and old.get("mtime") == stat.st_mtime_ns and old.get("size") == stat.st_size:
+                entries[entry.name] = old
+                continue
+            entries[entry.name] = _read_index_entry(entry.path, stat)
+            changed = True
+
+    with _cache_lock:
+        current = _panel_index_cache
+        if current is not cached:
+            for fname, entry in current.items():
+                if entry is not cached.get(fname):
+                    entries[fname] = entry
+            for fname in cached.keys() - current.keys():
+                entries.pop(fname, None)
+        if changed or entries.keys() != current.keys():
+            _write_index_file(entries)
+        _panel_index_cache = entries
+        return entries
+
+
+def update_panel_index(path, header):
+    """Record a .panel file that was just written, without reading it back from disk."""
+    global _panel_index_cache
+    fname = os.path.basename(path)
+    try:
+        entry = _index_entry(os.stat(path), header["hash"], header["project_info"], header["summary"])
+    except OSError:
+        return
+    if _panel_index_cache is None:
+        load_panel_index()
+    with _cache_lock:
+        entries = dict(_panel_index_cache)
+        entries[fname] = entry
+        legacy = panel_name_of(fname) + LEGACY_PANEL_EXT
+        if legacy in entries and not os.path.exists(os.path.join(PANELS_FOLDER, legacy)):
+            del entries[legacy]
+        _panel_index_cache = entries
+        _write_index_file(entries)
+
+
+def panels_for_project(customer, project, ref):
+    panels = []
+    for fname, entry in sorted(load_panel_index().items()):
+        pinfo = entry.get("project_info")
+        name = panel_name_of(fname)
+        if (pinfo and pinfo.get("customer") == customer and
+                pinfo.get("project") == project and
+                pinfo.get("ref") == ref and name not in panels):
+            panels.append(name)
+    return panels
+
+
+def migrate_panels():
+    """Convert every legacy .json panel to .panel; the originals go to PANEL_BACKUP_FOLDER.
+
+    Returns (converted, failed, conflicts). A .json panel that already has
+    a .panel twin is only moved aside, since the .panel file is the one that
+    is read; if the .json is the newer of the two it is left where it is and
+    counted as a conflict for the user to resolve.
+    """
+    converted = failed = conflicts = 0
+    names = sorted(f for f in os.listdir(PANELS_FOLDER) if f.endswith(LEGACY_PANEL_EXT))
+    for fname in names:
+        name = panel_name_of(fname)
+        src = os.path.join(PANELS_FOLDER, fname)
+        dst = os.path.join(PANELS_FOLDER, name + PANEL_EXT)
+        try:
+            if legacy_panel_conflict(name):
+                conflicts += 1
+                print(f"CONFLICT  {fname} is newer than {name}{PANEL_EXT}; left in place")
+                continue
+            if not os.path.exists(dst):
+                panel_data = read_panel_file(src)
+                write_panel_file(dst, panel_data)
+                if read_panel_file(dst) != dict(panel_body(panel_data), project_info=panel_data.get("project_info", {}) or {}):
+                    os.remove(dst)
+                    raise ValueError("converted file does not read back the same")
+                converted += 1
+            retire_legacy_panel(name)
+        except Exception as e:
+            failed += 1
+            print(f"FAILED  {fname}: {e}")
+    load_panel_index()
+    return converted, failed, conflicts
+# ====== End Panel Index ======
+
+
+# ====== Busbar Catalogue ======
+BUSBAR_TERMINAL_SIZES = [
+    "20x6 Busbar (5.5m Length) LVT",
+    "25x10 Busbar (5.5m Length) LVT",
+    "32x10 Cu Busbar (5.5m Length) LVT",
+    "40x10 Cu Busbar (5.5m Length) LVT",
+    "50x10 Cu Busbar (5.5m Length) LVT",
+    "63x10 Cu Busbar (5.5m Length) LVT",
+    "75x10 Cu Busbar (5.5m Length) LVT",
+    "80x10 Cu Busbar (5.5m Length) LVT",
+    "100x10 Cu Busbar (5.5m Length) LVT"
+]
+
+
+class BusbarCatalogue:
+    """Busbar rows of the quotation CSV compiled for lookups.
+
+    Areas are kept as a sorted NumPy array so the smallest busbar that carries
+    a required area is a searchsorted away, and size strings are resolved to
+    their first matching row once and remembered.
+    """
+
+    def __init__(self, part_nos, descriptions, areas, runs=None, prices=None):
+        self.prices = None if prices is None else np.asarray(prices, dtype=float)
+        self.rows = []
+        for i, (part_no, desc) in enumerate(zip(part_nos, descriptions)):
+            row = {"Part no": part_no, "Item description": desc}
+            if runs is not None:
+                row["No. of runs"] = runs[i]
+            self.rows.append(row)
+        self._descriptions = [d.lower() if isinstance(d, str) else None for d in descriptions]
+
+        areas = np.asarray(areas, dtype=float)
+        valid = np.flatnonzero(~np.isnan(areas))
+        # stable sort: among equal areas the first CSV row wins, as idxmin did
+        order = valid[np.argsort(areas[valid], kind="stable")]
+        self._sorted_areas = areas[order]
+        self._sorted_rows = order
+
+        self._size_index = {}
+        for size in BUSBAR_TERMINAL_SIZES:
+            self.match_size(size)
+
+    @classmethod
+    def from_frame(cls, df):
+        n = len(df)
+        part_nos = df["Part no"].tolist() if "Part no" in df else [None] * n
+        descriptions = df["Item description"].tolist() if "Item description" in df else [None] * n
+        if "Area (sqmm)" in df:
+            areas = pd.to_numeric(df["Area (sqmm)"], errors="coerce").to_numpy(dtype=float)
+        else:
+            areas = np.full(n, np.nan)
+        runs = df["No. of runs"].tolist() if "No. of runs" in df else None
+        price_col = _price_column(df)
+        prices = pd.to_numeric(df[price_col], errors="coerce").to_numpy(dtype=float) if price_col is not None else None
+        return cls(part_nos, descriptions, areas, runs, prices)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Build from the arrays of a compiled busbar cache (see compile_busbar_columns)."""
+        n = int(columns["rows"])
+        return cls(_decode_column(columns, "part_no") or [None] * n,
+                   _decode_column(columns, "description") or [None] * n,
+                   columns["area"],
+                   _decode_column(columns, "runs"),
+                   columns["price"] if "price" in columns else None)
+
+    def nearest_highest_rows(self, area_values):
+        """Position of the row with the smallest area >= each of area_values, -1 where none is large enough."""
+        area_values = np.asarray(area_values, dtype=float)
+        if not len(self._sorted_areas):
+            return np.full(len(area_values), -1, dtype=np.int64)
+        idx = np.searchsorted(self._sorted_areas, area_values, side="left")
+        found = idx < len(self._sorted_areas)
+        return np.where(found, self._sorted_rows[np.minimum(idx, len(self._sorted_areas) - 1)], -1)
+
+    def match_size(self, busbar_size_str):
+        """First row whose description contains the size string (case-insensitive), or None."""
+        key = busbar_size_str.lower()
+        if key not in self._size_index:
+            self._size_index[key] = next(
+                (self.rows[i] for i, desc in enumerate(self._descriptions) if desc is not None and key in desc), None)
+        return self._size_index[key]
+
+
+# The quotation CSV is compiled once into BUSBAR_CACHE_FILE, a NumPy .npz of
+# typed columns stamped with the CSV's mtime, size and sha1. Loading it skips
+# pandas entirely; it is rebuilt whenever the CSV's content changes.
+BUSBAR_CACHE_VERSION = 1
+_BUSBAR_TEXT_COLUMNS = (("part_no", "Part no"), ("description", "Item description"), ("runs", "No. of runs"))
+
+
+def _price_column(df):
+    return next((col for col in df.columns if "price" in str(col).lower()), None)
+
+
+def _encode_column(key, series):
+    if series.dtype.kind in "biuf":
+        return {key: series.to_numpy()}
+    # text columns: unicode array plus a mask for the missing (NaN) cells
+    values = series.tolist()
+    missing = [not isinstance(v, str) for v in values]
+    return {key: np.array(["" if m else v for v, m in zip(values, missing)], dtype=str),
+            f"{key}__missing": np.array(missing, dtype=bool)}
+
+
+def _decode_column(columns, key):
+    if key not in columns:
+        return None
+    values = columns[key].tolist()
+    if f"{key}__missing" in columns:
+        values = [float("nan") if m else v for v, m in zip(values, columns[f"{key}__missing"].tolist())]
+    return values
+
+
+def compile_busbar_columns(df):
+    """Typed column arrays for the cache: part no, description, area, runs and price (when present)."""
+    n = len(df)
+    columns = {"rows": np.array(n)}
+    for key, col in _BUSBAR_TEXT_COLUMNS:
+        if col in df:
+            columns.update(_encode_column(key, df[col]))
+    if "Area (sqmm)" in df:
+        columns["area"] = pd.to_numeric(df["Area (sqmm)"], errors="coerce").to_numpy(dtype=float)
+    else:
+        columns["area"] = np.full(n, np.nan)
+    price_col = _price_column(df)
+    if price_col is not None:
+        columns["price"] = pd.to_numeric(df[price_col], errors="coerce").to_numpy(dtype=float)
+    return columns
+
+
+def _read_busbar_cache(cache_path, stat, source_hash=None):
+    """Cached columns if they were compiled from this exact CSV, else None."""
+    try:
+        with np.load(cache_path, allow_pickle=False) as npz:
+            columns = {name: npz[name] for name in npz.files}
+    except Exception:
+        return None
+    if int(columns.pop("version", -1)) != BUSBAR_CACHE_VERSION:
+        return None
+    mtime, size, digest = int(columns.pop("source_mtime")), int(columns.pop("source_size")), str(columns.pop("source_hash"))
+    if (mtime, size) == (stat.st_mtime_ns, stat.st_size) or (source_hash is not None and digest == source_hash):
+        return columns
+    return None
+
+
+def _write_busbar_cache(cache_path, columns, stat, source_hash):
+    try:
+        atomic_write(cache_path, lambda f: np.savez(
+            f, version=np.array(BUSBAR_CACHE_VERSION), source_mtime=np.array(stat.st_mtime_ns),
+            source_size=np.array(stat.st_size), source_hash=np.array(source_hash), **columns), mode="wb")
+    except Exception as e:
+        print("Could not write busbar cache:", e)
+
+
+def load_busbar_catalogue(path=None, cache_path=None):
+    """BusbarCatalogue of the quotation CSV, served from the compiled cache when it is current."""
+    path = path or BUSBAR_DATA_FILE
+    cache_path = cache_path or BUSBAR_CACHE_FILE
+    stat = os.stat(path)
+    columns = _read_busbar_cache(cache_path, stat)
+    if columns is None:
+        with open(path, "rb") as f:
+            source_hash = content_hash(f.read())
+        # touched but unchanged (e.g. copied over by an installer): re-stamp instead of re-parsing
+        columns = _read_busbar_cache(cache_path, stat, source_hash)
+        if columns is None:
+            columns = compile_busbar_columns(pd.read_csv(path))
+        _write_busbar_cache(cache_path, columns, stat, source_hash)
+    return BusbarCatalogue.from_columns(columns)
+# ====== End Busbar Catalogue ======
+
+
+# ====== Per-panel BOM Cache ======
+# Each panel's BOM contribution (part counts, per-category counts, busbar
+# quantities) is computed once and cached against the panel's content hash,
+# the panel depth used for busbar extras and the busbar CSV it was priced
+# with. Generating the Total BOM then only merges precomputed tables.
+BOM_CACHE_VERSION = 1
+_bom_cache = None
+
+
+def _plain(value):
+    # numpy scalars coming out of the busbar CSV are not JSON serialisable
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def busbar_data_signature():
+    try:
+        stat = os.stat(BUSBAR_DATA_FILE)
+        return [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        return None
+
+
+def panel_part_rows(panel_data):
+    """Part and per-category counts of one panel, in first-seen order."""
+    parts = {}
+    categories = {}
+    for cub in panel_data.get("cubicles", []):
+        for comp in cub.get("compartments", []):
+            for sec in comp.get("sections", []):
+                item = sec.get("item")
+                if item:
+                    model = item["model"]
+                    desc = item.get("desc", "")
+                    category = sec.get("name", "Others")
+                    part = parts.setdefault(model, [model, desc, 0])
+                    part[1] = desc
+                    part[2] += 1
+                    cat_part = categories.setdefault((category, model), [category, model, desc, 0])
+                    cat_part[2] = desc
+                    cat_part[3] += 1
+    return list(parts.values()), list(categories.values())
+
+
+def busbar_rows_batch(panels, catalogue):
+    """Busbar BOM rows for many panels in one pass.
+
+    panels is a list of (busbars, panel_depth). All busbars are loaded into
+    NumPy columns; lengths, required areas, catalogue matches and quantities
+    are computed as arrays and then grouped by part number per panel.
+    Returns one [[part_no, desc, qty], ...] list per panel in first-seen
+    order, with part_no None for busbars that have no catalogue match.
+    """
+    result = [[] for _ in panels]
+    n = sum(len(busbars) for busbars, _ in panels)
+    if n == 0:
+        return result
+
+    panel_idx = np.empty(n, dtype=np.int64)
+    horizontal = np.zeros(n, dtype=bool)
+    coords = np.zeros((n, 4))
+    runs = np.ones(n)
+    amps = np.zeros(n)
+    densities = np.ones(n)
+    sized = np.zeros(n, dtype=bool)     # terminal busbars priced by size string
+    rated = np.zeros(n, dtype=bool)     # busbars sized from amperage / current density
+    single_sized = np.zeros(n, dtype=bool)
+    single_rated = np.zeros(n, dtype=bool)
+    size_strs = np.empty(n, dtype=object)
+    raw = [None] * n
+
+    depth_term = np.zeros(len(panels))  # added to the length of terminal busbars
+    depth_extra = np.zeros(len(panels))  # added per run to rated busbars
+    int_depth = []
+    i = 0
+    for p, (busbars, panel_depth) in enumerate(panels):
+        depth_term[p] = (panel_depth or 400) - 400
+        if panel_depth and panel_depth > 400:
+            depth_extra[p] = panel_depth - 400
+        int_depth.append(not isinstance(panel_depth, float))
+        for busbar in busbars:
+            panel_idx[i] = p
+            horizontal[i] = busbar.get("type") == "horizontal"
+            coords[i] = busbar.get("coords", [0, 0, 0, 0])[:4]
+            try:
+                runs[i] = int(busbar.get("no_of_runs", 1))
+            except Exception:
+                runs[i] = 1
+            amp = busbar.get("amperage")
+            cd = busbar.get("current_density")
+            phase = busbar.get("phase", "Single Phase")
+            size_str = busbar.get("busbar_size", "")
+            if size_str:
+                sized[i] = True
+                size_strs[i] = size_str
+                single_sized[i] = str(phase).lower().startswith("single")
+            elif cd is not None and amp is not None and cd > 0 and amp > 0:
+                rated[i] = True
+                amps[i] = amp
+                densities[i] = cd
+                single_rated[i] = phase == "Single Phase"
+                raw[i] = (phase, amp, cd)
+            i += 1
+
+    length = np.where(horizontal, coords[:, 2] - coords[:, 0], coords[:, 3] - coords[:, 1])
+    length = np.maximum(np.trunc(length), 0)
+    qty = np.zeros(n)
+
+    key_values = []   # part numbers, indexed by key id
+    key_ids = {}
+    desc_values = []  # descriptions, indexed by desc id
+    key_id = np.full(n, -1, dtype=np.int64)
+    desc_id = np.full(n, -1, dtype=np.int64)
+
+    def key_for(part_no):
+        if part_no not in key_ids:
+            key_ids[part_no] = len(key_values)
+            key_values.append(part_no)
+        return key_ids[part_no]
+
+    sized_idx = np.flatnonzero(sized)
+    if len(sized_idx):
+        sizes, inverse = np.unique(size_strs[sized_idx].astype(str), return_inverse=True)
+        size_keys = np.empty(len(sizes), dtype=np.int64)
+        size_descs = np.empty(len(sizes), dtype=np.int64)
+        for u, size_str in enumerate(sizes.tolist()):
+            match = catalogue.match_size(size_str)
+            if match is not None:
+                part_no, desc = str(match["Part no"]), str(match["Item description"])
+            else:
+                part_no, desc = size_str, size_str  # fallback
+            size_keys[u] = key_for(part_no)
+            size_descs[u] = len(desc_values)
+            desc_values.append(desc)
+        key_id[sized_idx] = size_keys[inverse]
+        desc_id[sized_idx] = size_descs[inverse]
+        multiplier = np.where(single_sized[sized_idx], 2, 4)
+        qty[sized_idx] = (length[sized_idx] + depth_term[panel_idx[sized_idx]]) * runs[sized_idx] * multiplier
+
+    rated_idx = np.flatnonzero(rated)
+    no_match_idx = rated_idx[:0]
+    if len(rated_idx):
+        rows = catalogue.nearest_highest_rows(amps[rated_idx] / densities[rated_idx])
+        matched = rows >= 0
+        no_match_idx = rated_idx[~matched]
+        matched_idx = rated_idx[matched]
+        if len(matched_idx):
+            positions, inverse = np.unique(rows[matched], return_inverse=True)
+            row_keys = np.empty(len(positions), dtype=np.int64)
+            row_descs = np.empty(len(positions), dtype=np.int64)
+            row_runs = np.empty(len(positions))
+            for u, pos in enumerate(positions.tolist()):
+                row = catalogue.rows[pos]
+                row_keys[u] = key_for(_plain(row["Part no"]))
+                row_descs[u] = len(desc_values)
+                desc_values.append(_plain(row["Item description"]))
+                row_runs[u] = int(row["No. of runs"]) if "No. of runs" in row else 1
+            key_id[matched_idx] = row_keys[inverse]
+            desc_id[matched_idx] = row_descs[inverse]
+            multiplier = np.where(single_rated[matched_idx], 2, 4)
+            qty[matched_idx] = (length[matched_idx] * row_runs[inverse] * multiplier +
+                                depth_extra[panel_idx[matched_idx]] * runs[matched_idx])
+
+    # every unmatched busbar is its own NO_MATCH row
+    for i in no_match_idx.tolist():
+        phase, amp, cd = raw[i]
+        key_id[i] = len(key_values)
+        key_values.append(None)
+        desc_id[i] = len(desc_values)
+        desc_values.append(f"No match for Phase={phase}, Amperage={amp}, CD={cd}, AreaNeeded={amp / cd:.2f}")
+
+    priced = np.flatnonzero(key_id >= 0)
+    if not len(priced):
+        return result
+    group_code = panel_idx[priced] * len(key_values) + key_id[priced]
+    codes, first, inverse = np.unique(group_code, return_index=True, return_inverse=True)
+    last = len(priced) - 1 - np.unique(group_code[::-1], return_index=True)[1]
+    totals = np.bincount(inverse, weights=qty[priced], minlength=len(codes))
+
+    for g in np.argsort(first, kind="stable").tolist():
+        p = int(panel_idx[priced[first[g]]])
+        part_no = key_values[int(key_id[priced[first[g]]])]
+        desc = desc_values[int(desc_id[priced[last[g]]])]
+        total = int(totals[g]) if int_depth[p] else float(totals[g])
+        result[p].append([part_no, desc, total])
+    return result
+
+
+def _read_bom_cache():
+    try:
+        with open(BOM_CACHE_FILE, "r") as f:
+            data = json.load(f)
+        if data.get("version") == BOM_CACHE_VERSION:
+            return data.get("panels", {})
+    except Exception:
+        pass
+    return {}
+
+
+def _write_bom_cache(entries):
+    try:
+        write_json_file(BOM_CACHE_FILE, {"version": BOM_CACHE_VERSION, "panels": entries})
+    except Exception as e:
+        print("Could not write BOM cache:", e)
+
+
+def _panel_bom_inputs(path):
+    """(parts, categories, busbars, saved depth) of one panel file.
+
+    For a .panel file the part rows come from the header and the body is
+    only inflated when the panel has busbars to price.
+    """
+    if not path.endswith(PANEL_EXT):
+        panel_data = read_panel_file(path)
+        parts, categories = panel_part_rows(panel_data)
+        return parts, categories, panel_data.get("busbars", []), panel_data.get("panel_depth")
+    header = read_panel_header(path)
+    summary = header.get("summary") or {}
+    busbars = read_panel_file(path).get("busbars", []) if summary.get("busbars") else []
+    return header["bom"]["parts"], header["bom"]["categories"], busbars, summary.get("panel_depth")
+
+
+def _compute_bom_contributions(panel_names, busbar_catalogue, panel_depth, per_panel_depth, cache):
+    """Return ([(panel_name, contribution)], {filename: new cache entry}) without touching the cache file.
+
+    A contribution holds the BOM rows one panel adds to the project totals,
+    in first-seen order. Busbars of all panels that need recomputing are
+    priced together in one busbar_rows_batch call; busbars without a
+    catalogue match are kept as separate rows with a part number of None and
+    are numbered NO_MATCH_n when contributions are merged.
+    """
+    index = load_panel_index()
+    catalogue = busbar_data_signature()
+
+    contributions = []
+    pending = []
+    for pname in panel_names:
+        fname = panel_filename(pname, index)
+        entry = index.get(fname, {})
+        panel_hash = entry.get("hash")
+        depth = (entry.get("summary") or {}).get("panel_depth") if per_panel_depth else panel_depth
+        cached = cache.get(fname)
+        if (cached and panel_hash and cached.get("hash") == panel_hash and
+                cached.get("depth") == depth and cached.get("catalogue") == catalogue):
+            contributions.append((pname, cached["contribution"]))
+            continue
+        parts, categories, busbars, saved_depth = _panel_bom_inputs(os.path.join(PANELS_FOLDER, fname))
+        if per_panel_depth:
+            depth = saved_depth
+        contributions.append((pname, None))
+        pending.append((len(contributions) - 1, fname, panel_hash, depth, parts, categories, busbars))
+
+    busbar_rows = busbar_rows_batch([(busbars, depth) for _, _, _, depth, _, _, busbars in pending], busbar_catalogue)
+    updated = {}
+    for (pos, fname, panel_hash, depth, parts, categories, _), busbars in zip(pending, busbar_rows):
+        contribution = {"parts": parts, "categories": categories, "busbars": busbars}
+        contributions[pos] = (contributions[pos][0], contribution)
+        if panel_hash:
+            updated[fname] = {"hash": panel_hash, "depth": depth, "catalogue": catalogue,
+                              "contribution": contribution}
+    return contributions, updated
+
+
+def store_bom_cache_entries(updated):
+    global _bom_cache
+    with _cache_lock:
+        cache = dict(_read_bom_cache() if _bom_cache is None else _bom_cache)
+        cache.update(updated)
+        index = load_panel_index()
+        stale = [f for f in cache if f not in index]
+        for fname in stale:
+            del cache[fname]
+        _bom_cache = cache
+        if updated or stale:
+            _write_bom_cache(cache)
+
+
+def project_bom_contributions(panel_names, busbar_catalogue, panel_depth=None, per_panel_depth=False):
+    """Return [(panel_name, contribution)], recomputing only panels that changed since the last run.
+
+    With per_panel_depth each panel's busbar extras use its own saved depth
+    instead of panel_depth.
+    """
+    global _bom_cache
+    with _cache_lock:
+        if _bom_cache is None:
+            _bom_cache = _read_bom_cache()
+        cache = _bom_cache
+    contributions, updated = _compute_bom_contributions(panel_names, busbar_catalogue, panel_depth, per_panel_depth, cache)
+    store_bom_cache_entries(updated)
+    return contributions
+
+
+def merge_bom_contributions(contributions):
+    part_totals = defaultdict(lambda: {"desc": "", "total": 0, "panels": defaultdict(int)})
+    category_totals = defaultdict(lambda: defaultdict(lambda: {"desc": "", "total": 0, "panels": defaultdict(int)}))
+    busbar_totals = defaultdict(lambda: {"total": 0, "panels": defaultdict(int), "desc": ""})
+    no_match_counter = 0
+
+    for pname, contribution in contributions:
+        for model, desc, count in contribution["parts"]:
+            bucket = part_totals[model]
+            bucket["desc"] = desc
+            bucket["total"] += count
+            bucket["panels"][pname] += count
+        for category, model, desc, count in contribution["categories"]:
+            bucket = category_totals[category][model]
+            bucket["desc"] = desc
+            bucket["total"] += count
+            bucket["panels"][pname] += count
+        for part_no, desc, qty in contribution["busbars"]:
+            if part_no is None:
+                part_no = f"NO_MATCH_{no_match_counter}"
+                no_match_counter += 1
+            bucket = busbar_totals[part_no]
+            bucket["desc"] = desc
+            bucket["total"] += qty
+            bucket["panels"][pname] += qty
+
+    return part_totals, category_totals, busbar_totals
+# ====== End Per-panel BOM Cache ======
+
+# ====== BOM Engine ======
+# Tk-free project BOM: aggregation, table rows, CSV and PDF output. Used by
+# PanelDesigner.generate_bom and by the --bom / --bom-all command line.
+BOM_HEADER = ["Part No.", "Description", "Total Qty"]
+
+
+def build_project_bom(customer, project, ref, busbar_catalogue, panel_depth=None, per_panel_depth=False, cache=None):
+    relevant_panels = panels_for_project(customer, project, ref)
+    if cache is None:
+        contributions = project_bom_contributions(relevant_panels, busbar_catalogue, panel_depth, per_panel_depth)
+        updated = {}
+    else:
+        contributions, updated = _compute_bom_contributions(relevant_panels, busbar_catalogue, panel_depth, per_panel_depth, cache)
+    part_totals, category_totals, busbar_totals = merge_bom_contributions(contributions)
+    return {
+        "customer": customer,
+        "project": project,
+        "ref": ref,
+        "panels": relevant_panels,
+        "part_totals": part_totals,
+        "category_totals": category_totals,
+        "busbar_totals": busbar_totals,
+        "cache_updates": updated,
+    }
+
+
+def _bom_table(totals, panels):
+    rows = []
+    for model, info in totals.items():
+        row = [model, info["desc"], info["total"]]
+        for pname in panels:
+            row.append(info["panels"].get(pname, 0))
+        rows.append([_plain(v) for v in row])
+    return rows
+
+
+def total_bom_rows(bom):
+    """Rows of the Total BOM sheet: all parts, then the busbar materials block."""
+    header = BOM_HEADER + bom["panels"]
+    rows = [header]
+    rows += _bom_table(bom["part_totals"], bom["panels"])
+    rows.append([])
+    rows.append(["Busbar Materials"])
+    rows.append(header)
+    rows += _bom_table(bom["busbar_totals"], bom["panels"])
+    return rows
+
+
+def write_bom_csv(csv_path, bom):
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(total_bom_rows(bom))
+    return csv_path
+
+
+def write_bom_pdf(pdf_path, bom):
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    from reportlab.lib.pagesizes import A4
+
+    relevant_panels = bom["panels"]
+    doc = SimpleDocTemplate(pdf_path, pagesize=A4, rightMargin=24, leftMargin=24, topMargin=24, bottomMargin=24)
+
+    styles = getSampleStyleSheet()
+    elements = []
+
+    header_table_data = []
+    logo_path = resource_path("VLPP.ico")
+    if os.path.exists(logo_path):
+        header_logo = RLImage(logo_path, width=40, height=40)
+    else:
+        header_logo = Paragraph("", styles["Normal"])
+
+    header_email = Paragraph("<b>venora@gmail.com</b>", styles["Normal"])
+    header_table_data.append([header_logo, header_email])
+
+    header_table = Table(header_table_data, colWidths=[60, 440])
+    header_table.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "MIDDLE"), ("ALIGN", (1, 0), (1, 0), "RIGHT")]))
+    elements.append(header_table)
+    elements.append(Spacer(1, 8))
+
+    project_style = ParagraphStyle("ProjectInfo", parent=styles["Normal"], fontSize=10, leading=13, spaceAfter=6)
+    project_info_text = (f"<b>Customer:</b> {bom['customer']}<br/>"
+                         f"<b>Project:</b> {bom['project']}<br/>"
+                         f"<b>Reference:</b> {bom['ref']}")
+    project_info_para = Paragraph(project_info_text, project_style)
+    elements.append(project_info_para)
+    elements.append(Spacer(1, 8))
+
+    title = Paragraph("<b>Total Bill of Materials (BOM)</b>", styles["Title"])
+    elements.append(title)
+    elements.append(Spacer(1, 12))
+
+    def build_table(rows):
+        table = Table(rows, repeatRows=1)
+        table_style = TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 6),
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.black),
+        ])
+        table.setStyle(table_style)
+        for i in range(1, len(rows)):
+            if i % 2 == 0:
+                table.setStyle(TableStyle([("BACKGROUND", (0, i), (-1, i), colors.whitesmoke)]))
+            else:
+                table.setStyle(TableStyle([("BACKGROUND", (0, i), (-1, i), colors.beige)]))
+        return table
+
+    for cat in SECTION_NAMES:
+        items = bom["category_totals"].get(cat, {})
+        if not items:
+            continue
+        elements.append(Paragraph(f"<b>{cat}</b>", styles["Heading2"]))
+        header_row = BOM_HEADER + relevant_panels
+        rows = [header_row]
+        for model, info in items.items():
+            row = [model, info["desc"], int(info["total"])]
+            for pname in relevant_panels:
+                row.append(int(info["panels"].get(pname, 0)))
+            rows.append(row)
+        elements.append(build_table(rows))
+        elements.append(Spacer(1, 12))
+
+    if bom["busbar_totals"]:
+        elements.append(Paragraph("<b>Busbar Materials</b>", styles["Heading2"]))
+        header_row = BOM_HEADER + relevant_panels
+        rows = [header_row]
+        for model, info in bom["busbar_totals"].items():
+            row = [model, info["desc"], int(info["total"])]
+            for pname in relevant_panels:
+                row.append(int(info["panels"].get(pname, 0)))
+            rows.append(row)
+        elements.append(build_table(rows))
+
+    doc.build(elements)
+    return pdf_path
+
+
+def _safe_filename(name):
+    return "".join(ch if ch.isalnum() or ch in " -_.()" else "_" for ch in name).strip() or "project"
+
+
+def export_project_bom(key, out_dir, formats=("csv", "pdf")):
+    """Process-pool worker: write the Total BOM of one (customer, project, ref).
+
+    Reads the BOM cache but never writes it; new cache entries are returned so
+    the parent process can store them in one go.
+    """
+    customer, project, ref = key
+    bom = build_project_bom(customer, project, ref, load_busbar_catalogue(), per_panel_depth=True,
+                            cache=_read_bom_cache())
+    project_folder = os.path.join(out_dir, _safe_filename(f"{customer}_{project}_{ref}"))
+    os.makedirs(project_folder, exist_ok=True)
+    paths = []
+    if "csv" in formats:
+        paths.append(write_bom_csv(os.path.join(project_folder, "Total_BOM.csv"), bom))
+    if "pdf" in formats:
+        paths.append(write_bom_pdf(os.path.join(project_folder, "Total_BOM.pdf"), bom))
+    return paths, bom["cache_updates"]
+
+
+def select_projects(project_map, specs):
+    """Resolve --bom arguments: "customer|project|ref", or a single name matching any of the three."""
+    keys = []
+    for spec in specs:
+        parts = [p.strip() for p in spec.split("|")]
+        if len(parts) == 3:
+            matches = [k for k in project_map if k == tuple(parts)]
+        else:
+            matches = [k for k in project_map if spec.strip() in k]
+        if not matches:
+            print(f"No project matches '{spec}'")
+        keys.extend(k for k in sorted(matches) if k not in keys)
+    return keys
+
+
+def run_bom_cli(args):
+    _, project_map = load_all_projects()
+    keys = sorted(project_map) if args.bom_all else select_projects(project_map, args.bom)
+    if not keys:
+        print("No projects to export.")
+        return 1
+    try:
+        load_busbar_catalogue()  # also compiles the cache once, before the workers start
+    except Exception as e:
+        print(f"Failed to load busbar data from {BUSBAR_DATA_FILE}: {e}")
+        return 1
+
+    out_dir = os.path.abspath(args.out)
+    formats = args.formats
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(keys)))
+    failures = 0
+    cache_updates = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(export_project_bom, key, out_dir, formats): key for key in keys}
+        for future in as_completed(futures):
+            name = " | ".join(futures[future])
+            try:
+                paths, updated = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"FAILED  {name}: {e}")
+                continue
+            cache_updates.update(updated)
+            print(f"OK      {name}: {', '.join(paths)}")
+
+    store_bom_cache_entries(cache_updates)
+    print(f"{len(keys) - failures}/{len(keys)} project BOMs written to {out_dir}")
+    return 1 if failures else 0
+
+
+BOM_FORMATS = ("csv", "pdf")
+
+
+def parse_formats(value):
+    formats = tuple(f.strip().lower() for f in value.split(",") if f.strip())
+    unknown = [f for f in formats if f not in BOM_FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(
+            f"unknown format {', '.join(unknown) or repr(value)} (choose from {', '.join(BOM_FORMATS)})")
+    return formats
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Panel Designer")
+    parser.add_argument("--bom", action="append", default=[], metavar="PROJECT",
+                        help='export the Total BOM of "customer|project|ref" (or every project matching a single name); repeatable')
+    parser.add_argument("--bom-all", action="store_true", help="export the Total BOM of every saved project")
+    parser.add_argument("--out", default=os.path.join(os.path.expanduser("~"), "Desktop", "BOM"),
+                        help="output folder for --bom/--bom-all (default: ~/Desktop/BOM)")
+    parser.add_argument("--formats", default="csv,pdf", type=parse_formats, help="comma separated output formats (csv, pdf)")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: CPU count)")
+    parser.add_argument("--migrate-panels", action="store_true",
+                        help="convert saved .json panels to the .panel format (originals are kept in panels/legacy_json)")
+    parser.add_argument("--profile-startup", action="store_true", help="print a breakdown of start-up time once the designer is up")
+    return parser
+# ====== End BOM Engine ======
+
+
+# ====== Sheets Sync ======
+# BOM output is pushed to Google Sheets as a diff: the target worksheets are
+# read in one values_batch_get, compared cell by cell with the rows we want,
+# and every changed run of cells, any grid growth and the header formatting
+# go out in a single spreadsheet.batch_update. Only values_batch_get,
+# batch_update and the worksheets' id/title/row_count/col_count are used,
+# so a plain in-memory object can stand in for a spreadsheet.
+def bom_header_format():
+    return gspread_formatting.CellFormat(
+        backgroundColor=gspread_formatting.Color(0.8, 0.8, 0.8),
+        horizontalAlignment="CENTER",
+        textFormat=gspread_formatting.TextFormat(bold=True),
+    )
+HEADER_FORMAT_COLUMNS = 26  # A:Z
+
+
+def panel_sheet_rows(cubicles, busbars):
+    """Rows of a panel's worksheet: one per compartment, then the busbar table."""
+    data = [["Cubicle (X,Y)"] + SECTION_NAMES]
+    for cub_idx, cub in enumerate(cubicles, start=1):
+        for comp_idx, comp in enumerate(cub["compartments"], start=1):
+            row = [f"{cub_idx},{comp_idx}"]
+            for section_name in SECTION_NAMES:
+                item = next((sec["item"] for sec in comp["sections"] if sec["name"] == section_name and sec["item"]), None)
+                row.append(item["model"] if item else "")
+            data.append(row)
+
+    data.append([])
+    data.append(["Busbars"])
+    data.append(["Type", "Amperage (A)", "Current Density (A/mm²)", "Coordinates (x1, y1, x2, y2)", "Phase", "Busbar Size", "No. of Runs", "Busbar Length (mm)"])
+    for bus in busbars:
+        coords = tuple(map(int, bus["coords"]))
+        length = (coords[2] - coords[0]) if bus["type"] == "horizontal" else (coords[3] - coords[1])
+        data.append([bus.get("type"), bus.get("amperage"), bus.get("current_density"), str(coords), bus.get("phase"), bus.get("busbar_size", ""), bus.get("no_of_runs", ""), length])
+    return data
+
+
+def _cell_text(value):
+    """The text Sheets shows for a value we write, for comparison with what it returns."""
+    value = _plain(value)
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _cell_data(value):
+    value = _plain(value)
+    if value is None or value == "":
+        return {}  # written with fields=userEnteredValue this clears the cell
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+
+def _grid_range(sheet_id, row, col_start, col_end, row_end=None):
+    return {"sheetId": sheet_id, "startRowIndex": row, "endRowIndex": row + 1 if row_end is None else row_end,
+            "startColumnIndex": col_start, "endColumnIndex": col_end}
+
+
+def sheet_diff_requests(sheet_id, current, desired):
+    """updateCells requests turning the current grid values into desired.
+
+    Each maximal run of changed cells in a row becomes one request; cells
+    that hold a value now but fall outside desired are cleared.
+    """
+    batch = []
+    for r in range(max(len(current), len(desired))):
+        have = current[r] if r < len(current) else []
+        want = desired[r] if r < len(desired) else []
+        run_start = None
+        for c in range(max(len(have), len(want)) + 1):
+            changed = False
+            if c < max(len(have), len(want)):
+                old = have[c] if c < len(have) else ""
+                new = want[c] if c < len(want) else None
+                changed = old != _cell_text(new)
+            if changed and run_start is None:
+                run_start = c
+            elif not changed and run_start is not None:
+                cells = [_cell_data(want[i] if i < len(want) else None) for i in range(run_start, c)]
+                batch.append({"updateCells": {
+                    "range": _grid_range(sheet_id, r, run_start, c),
+                    "rows": [{"values": cells}],
+                    "fields": "userEnteredValue",
+                }})
+                run_start = None
+    return batch
+
+
+def sheet_resize_requests(ws, desired):
+    """appendDimension requests for a worksheet too small for desired; also returns the resulting column count."""
+    batch = []
+    rows_needed = len(desired)
+    cols_needed = max((len(row) for row in desired), default=0)
+    if rows_needed > ws.row_count:
+        batch.append({"appendDimension": {"sheetId": ws.id, "dimension": "ROWS", "length": rows_needed - ws.row_count}})
+    if cols_needed > ws.col_count:
+        batch.append({"appendDimension": {"sheetId": ws.id, "dimension": "COLUMNS", "length": cols_needed - ws.col_count}})
+    return batch, max(ws.col_count, cols_needed)
+
+
+def header_format_request(sheet_id, cell_format, columns):
+    return {"repeatCell": {
+        "range": _grid_range(sheet_id, 0, 0, columns),
+        "cell": {"userEnteredFormat": cell_format.to_props()},
+        "fields": ",".join(cell_format.affected_fields("userEnteredFormat")),
+    }}
+
+
+def sync_worksheets(spreadsheet, targets):
+    """Bring worksheets up to date with one read and one write.
+
+    targets is a list of (worksheet, rows, header_format or None). Returns the
+    number of updateCells requests sent.
+    """
+    if not targets:
+        return 0
+    ranges = ["'{}'".format(ws.title.replace("'", "''")) for ws, _, _ in targets]
+    value_ranges = spreadsheet.values_batch_get(ranges).get("valueRanges", [])
+
+    batch = []
+    cell_requests = 0
+    for i, (ws, rows, header_format) in enumerate(targets):
+        current = value_ranges[i].get("values", []) if i < len(value_ranges) else []
+        resize, columns = sheet_resize_requests(ws, rows)
+        diff = sheet_diff_requests(ws.id, current, rows)
+        batch += resize + diff
+        cell_requests += len(diff)
+        if header_format is not None:
+            batch.append(header_format_request(ws.id, header_format, min(HEADER_FORMAT_COLUMNS, columns)))
+
+    if batch:
+        spreadsheet.batch_update({"requests": batch})
+    return cell_requests
+
+
+def project_key(customer, project, ref):
+    return json.dumps([customer, project, ref])
+
+
+def load_project_sheets():
+    """{project_key: {"spreadsheet_id": ..., "worksheets": {title: sheet id}}} remembered from earlier exports."""
+    try:
+        with open(PROJECTS_FILE, "r") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def save_project_sheets(projects):
+    try:
+        write_json_file(PROJECTS_FILE, projects, indent=2)
+    except Exception as e:
+        print("Could not write project sheet ids:", e)
+
+
+def open_project_spreadsheet(client, entry, spreadsheet_name):
+    """Open the project's spreadsheet by its remembered key, searching by name only if that is gone."""
+    spreadsheet_id = entry.get("spreadsheet_id")
+    if spreadsheet_id:
+        try:
+            return client.open_by_key(spreadsheet_id)
+        except (gspread.SpreadsheetNotFound, PermissionError):  # deleted, or no longer shared with us
+            entry["worksheets"] = {}
+    try:
+        spreadsheet = client.open(spreadsheet_name)
+    except gspread.SpreadsheetNotFound:
+        spreadsheet = client.create(spreadsheet_name)
+    entry["spreadsheet_id"] = spreadsheet.id
+    return spreadsheet
+
+
+def project_worksheet(spreadsheet, sheets, entry, title, rows, cols):
+    """Find a worksheet by remembered id (then by title) among sheets, adding it if missing."""
+    ws = sheets.get(entry["worksheets"].get(title))
+    if ws is None or ws.title != title:
+        ws = next((w for w in sheets.values() if w.title == title), None)
+    if ws is None:
+        ws = spreadsheet.add_worksheet(title=title, rows=rows, cols=cols)
+    entry["worksheets"][title] = ws.id
+    return ws
+
+
+def upload_bom_to_sheets(key, spreadsheet_name, sheet_title, panel_rows, bom):
+    """Write a panel's sheet and the project's Total BOM sheet to Google Sheets."""
+    try:
+        _upload_bom(get_sheets_client(), key, spreadsheet_name, sheet_title, panel_rows, bom)
+    except google_auth_exceptions.RefreshError:
+        reset_sheets_client()
+        raise
+
+
+def _upload_bom(client, key, spreadsheet_name, sheet_title, panel_rows, bom):
+    projects = load_project_sheets()
+    entry = projects.setdefault(key, {})
+    entry.setdefault("worksheets", {})
+    spreadsheet = open_project_spreadsheet(client, entry, spreadsheet_name)
+
+    # one metadata fetch resolves both worksheets
+    sheets = {w.id: w for w in spreadsheet.worksheets()}
+    ws = project_worksheet(spreadsheet, sheets, entry, sheet_title, "200", "20")
+    total_ws = project_worksheet(spreadsheet, sheets, entry, "Total BOM", "200", "30")
+    save_project_sheets(projects)
+
+    sync_worksheets(spreadsheet, [
+        (ws, panel_rows, None),
+        (total_ws, total_bom_rows(bom), bom_header_format()),
+    ])
+# ====== End Sheets Sync ======
+
+
+# ====== Component Search ======
+SEARCH_RESULT_LIMIT = 200
+SEARCH_DEBOUNCE_MS = 150
+
+
+class SearchResult:
+    def __init__(self, index, query, ids):
+        self.index = index
+        self.query = query
+        self.ids = ids  # every match, in catalogue order
+        self._ranked = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def page(self, start, stop):
+        """Ranked matches start..stop as (model, desc) pairs.
+
+        Only the best SEARCH_RESULT_LIMIT are ranked up front; the full
+        ordering is computed the first time a later page is requested.
+        """
+        stop = min(stop, len(self.ids))
+        if len(self._ranked) < stop:
+            if not self.query:
+                self._ranked = self.ids
+            elif stop <= SEARCH_RESULT_LIMIT:
+                self._ranked = heapq.nsmallest(SEARCH_RESULT_LIMIT, self.ids, key=self.index.rank_key(self.query))
+            else:
+                self._ranked = sorted(self.ids, key=self.index.rank_key(self.query))
+        return [(self.index.models[i], self.index.descs[i]) for i in self._ranked[start:stop]]
+
+
+class ComponentSearchIndex:
+    """Lowercased substring index over the breaker catalogue.
+
+    Each entry's description and model are lowercased once and every
+    trigram is posted to a compact id array, so a query of three or more
+    characters only has to verify the entries of its rarest trigram.
+    """
+
+    def __init__(self, breaker_types):
+        self.models = list(breaker_types.keys())
+        self.descs = [str(breaker_types[m]) for m in self.models]
+        self._models_lower = [str(m).lower() for m in self.models]
+        self._descs_lower = [d.lower() for d in self.descs]
+        self._trigrams = defaultdict(lambda: array("i"))
+        for i, (model, desc) in enumerate(zip(self._models_lower, self._descs_lower)):
+            grams = {model[j:j + 3] for j in range(len(model) - 2)}
+            grams.update(desc[j:j + 3] for j in range(len(desc) - 2))
+            for gram in grams:
+                self._trigrams[gram].append(i)
+
+    def __len__(self):
+        return len(self.models)
+
+    def search(self, query, previous=None):
+        """Match query against descriptions and models like the old substring filter.
+
+        previous is the SearchResult of an earlier query; when that query is
+        contained in the new one its matches are the only possible candidates.
+        """
+        q = query.lower()
+        if not q:
+            return SearchResult(self, q, list(range(len(self.models))))
+
+        candidates = None
+        if previous is not None and previous.query in q:
+            candidates = previous.ids
+        if len(q) >= 3:
+            postings = [self._trigrams.get(q[j:j + 3]) for j in range(len(q) - 2)]
+            if any(p is None for p in postings):
+                return SearchResult(self, q, [])
+            rarest = min(postings, key=len)
+            if candidates is None or len(rarest) < len(candidates):
+                candidates = rarest
+        if candidates is None:
+            candidates = range(len(self.models))
+
+        models, descs = self._models_lower, self._descs_lower
+        return SearchResult(self, q, [i for i in candidates if q in descs[i] or q in models[i]])
+
+    def rank_key(self, q):
+        models, descs = self._models_lower, self._descs_lower
+
+        def key(i):
+            model, desc = models[i], descs[i]
+            if model == q:
+                tier = 0
+            elif model.startswith(q):
+                tier = 1
+            elif desc.startswith(q):
+                tier = 2
+            elif " " + q in desc:
+                tier = 3  # word prefix in the description
+            elif q in model:
+                tier = 4
+            else:
+                tier = 5
+            return tier, len(desc), i
+        return key
+# ====== End Component Search ======
+
+# ====== Catalogue Import ======
+IMPORT_CHUNK_ROWS = 20000
+IMPORT_COLUMNS = ("Model No", "Description")
+CATEGORY_COLUMN = "Category"  # optional; values matching SECTION_NAMES are kept
+
+
+def _iter_csv_chunks(file_path, chunk_rows):
+    total = os.path.getsize(file_path) or 1
+    with open(file_path, "rb") as f:
+        reader = pd.read_csv(f, chunksize=chunk_rows, dtype=str, encoding_errors="replace")
+        for chunk in reader:
+            missing = [c for c in IMPORT_COLUMNS if c not in chunk.columns]
+            if missing:
+                raise ValueError("File must have 'Model No' and 'Description' columns.")
+            columns = list(IMPORT_COLUMNS) + ([CATEGORY_COLUMN] if CATEGORY_COLUMN in chunk.columns else [])
+            yield chunk[columns], min(1.0, f.tell() / total)
+
+
+def _iter_xlsx_chunks(file_path, chunk_rows):
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        if any(c not in header for c in IMPORT_COLUMNS):
+            raise ValueError("Excel must have 'Model No' and 'Description' columns.")
+        columns = list(IMPORT_COLUMNS) + ([CATEGORY_COLUMN] if CATEGORY_COLUMN in header else [])
+        positions = [header.index(c) for c in columns]
+        total = ws.max_row or 0
+        done = 1
+        buf = []
+        for row in rows:
+            buf.append(tuple(row[p] if p < len(row) else None for p in positions))
+            if len(buf) >= chunk_rows:
+                done += len(buf)
+                yield pd.DataFrame(buf, columns=columns), (done / total if total else None)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=columns), 1.0
+    finally:
+        wb.close()
+
+
+def read_catalogue_file(file_path, progress=None, cancel=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Stream (model, description) pairs out of an .xlsx or .csv price list.
+
+    Rows are read in chunks (read-only workbook or chunked CSV) and only the
+    two catalogue columns are kept. Models are stripped, blanks dropped and
+    duplicates resolved to their first occurrence. progress(fraction) is
+    called after each chunk (fraction may be None when the size is unknown).
+    """
+    if file_path.lower().endswith(".csv"):
+        chunks = _iter_csv_chunks(file_path, chunk_rows)
+    else:
+        chunks = _iter_xlsx_chunks(file_path, chunk_rows)
+
+    frames = []
+    for chunk, fraction in chunks:
+        if cancel is not None and cancel.is_set():
+            return None
+        models = chunk["Model No"]
+        frame = pd.DataFrame({
+            "model": models.where(models.isna(), models.astype(str).str.strip()),
+            "desc": chunk["Description"].fillna("").astype(str).str.strip(),
+        })
+        if CATEGORY_COLUMN in chunk.columns:
+            categories = chunk[CATEGORY_COLUMN].fillna("").astype(str).str.strip()
+            frame["category"] = categories.where(categories.isin(SECTION_NAMES), None)
+        else:
+            frame["category"] = None
+        frames.append(frame[frame["model"].notna() & (frame["model"] != "")])
+        if progress is not None:
+            progress(fraction)
+
+    if not frames:
+        return pd.DataFrame(columns=["model", "desc", "category"])
+    return pd.concat(frames, ignore_index=True).drop_duplicates("model", keep="first")
+
+
+def diff_catalogue(frame, breaker_types, update_existing=False):
+    """Split an imported frame into ({new model: desc}, {existing model: changed desc})."""
+    known = frame["model"].isin(breaker_types.keys())
+    added = dict(zip(frame.loc[~known, "model"], frame.loc[~known, "desc"]))
+    updated = {}
+    if update_existing and known.any():
+        existing = frame.loc[known]
+        current = existing["model"].map(breaker_types)
+        changed = existing[existing["desc"] != current]
+        updated = dict(zip(changed["model"], changed["desc"]))
+    return added, updated
+# ====== End Catalogue Import ======
+
+# ====== Component Catalogue ======
+# The component catalogue lives in SQLite (FTS5 trigram index on model and
+# description, indexed model and category columns) when the bundled SQLite
+# supports it, so searches and imports never need the whole catalogue in
+# memory. Otherwise, or with USE_SQLITE_CATALOGUE off, the legacy
+# breaker_types.json dict is used. JSON catalogues migrate on first start.
+USE_SQLITE_CATALOGUE = True
+
+
+class JsonCatalogue:
+    def __init__(self, path=BREAKER_FILE):
+        self.path = path
+        self.types = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.types = json.load(f)
+            except Exception:
+                self.types = {}
+        self._index = None
+
+    def __len__(self):
+        return len(self.types)
+
+    def __contains__(self, model):
+        return model in self.types
+
+    def get(self, model, default=None):
+        return self.types.get(model, default)
+
+    def save(self):
+        write_json_file(self.path, self.types)
+
+    def search(self, query, previous=None, category=None):
+        # categories are not tracked in the JSON catalogue
+        if self._index is None:
+            self._index = ComponentSearchIndex(self.types)
+        return self._index.search(query, previous=previous)
+
+    def stage_import(self, frame, update_existing=False):
+        """Worker-thread half of an import: diff against the catalogue without changing it."""
+        return diff_catalogue(frame, self.types, update_existing)
+
+    def commit_import(self, staged):
+        """Tk-thread half of an import; returns (added, updated) counts."""
+        added, updated = staged
+        self.types.update(added)
+        self.types.update(updated)
+        if added or updated:
+            self.save()
+            self._index = None
+        return len(added), len(updated)
+
+
+class SqliteSearchResult:
+    def __init__(self, catalogue, query, category):
+        self.catalogue = catalogue
+        self.query = query
+        self.category = category
+        self._count = None
+
+    def _where(self):
+        q = self.query
+        clauses, params = [], []
+        source = "components c"
+        if len(q) >= 3:
+            source = "components_fts f JOIN components c ON c.id = f.rowid"
+            clauses.append("components_fts MATCH ?")
+            params.append('"' + q.replace('"', '""') + '"')
+        elif q:
+            like = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append("(c.model LIKE ? ESCAPE '\\' OR c.description LIKE ? ESCAPE '\\')")
+            params += [like, like]
+        if self.category:
+            clauses.append("(c.category = ? OR c.category IS NULL)")
+            params.append(self.category)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return source, where, params
+
+    def __len__(self):
+        if self._count is None:
+            source, where, params = self._where()
+            self._count = self.catalogue.conn.execute(f"SELECT count(*) FROM {source}{where}", params).fetchone()[0]
+        return self._count
+
+    def page(self, start, stop):
+        source, where, params = self._where()
+        q = self.query
+        if q:
+            prefix = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            order = ("CASE WHEN lower(c.model) = ? THEN 0 "
+                     "WHEN c.model LIKE ? ESCAPE '\\' THEN 1 "
+                     "WHEN c.description LIKE ? ESCAPE '\\' THEN 2 "
+                     "WHEN c.description LIKE ? ESCAPE '\\' THEN 3 "
+                     "WHEN c.model LIKE ? ESCAPE '\\' THEN 4 ELSE 5 END, length(c.description), c.id")
+            params = params + [q, prefix, prefix, "% " + prefix, "%" + prefix]
+        else:
+            order = "c.id"
+        rows = self.catalogue.conn.execute(
+            f"SELECT c.model, c.description FROM {source}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [max(0, stop - start), start]).fetchall()
+        return [tuple(r) for r in rows]
+
+
+class SqliteCatalogue:
+    def __init__(self, path=None, json_path=BREAKER_FILE):
+        self.path = path or CATALOGUE_DB_FILE
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS components (
+                id INTEGER PRIMARY KEY,
+                model TEXT NOT NULL UNIQUE,
+                description TEXT NOT NULL DEFAULT '',
+                category TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_components_category ON components(category);
+            CREATE VIRTUAL TABLE IF NOT EXISTS components_fts USING fts5(
+                model, description, content='components', content_rowid='id', tokenize='trigram'
+            );
+            CREATE TRIGGER IF NOT EXISTS components_ai AFTER INSERT ON components BEGIN
+                INSERT INTO components_fts(rowid, model, description) VALUES (new.id, new.model, new.description);
+            END;
+            CREATE TRIGGER IF NOT EXISTS components_ad AFTER DELETE ON components BEGIN
+                INSERT INTO components_fts(components_fts, rowid, model, description)
+                VALUES ('delete', old.id, old.model, old.description);
+            END;
+            CREATE TRIGGER IF NOT EXISTS components_au AFTER UPDATE ON components BEGIN
+                INSERT INTO components_fts(components_fts, rowid, model, description)
+                VALUES ('delete', old.id, old.model, old.description);
+                INSERT INTO components_fts(rowid, model, description) VALUES (new.id, new.model, new.description);
+            END;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.conn.commit()
+        self.migrate_json(json_path)
+
+    def migrate_json(self, json_path):
+        if self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone():
+            return
+        if json_path and os.path.exists(json_path):
+            try:
+                with open(json_path, "r") as f:
+                    types = json.load(f)
+            except Exception:
+                types = {}
+            upsert_components(self.conn, ((str(m), str(d), None) for m, d in types.items()), update_existing=False)
+        self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('migrated_json', ?)", (json_path or "",))
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT count(*) FROM components").fetchone()[0]
+
+    def __contains__(self, model):
+        return self.conn.execute("SELECT 1 FROM components WHERE model = ?", (model,)).fetchone() is not None
+
+    def get(self, model, default=None):
+        row = self.conn.execute("SELECT description FROM components WHERE model = ?", (model,)).fetchone()
+        return row[0] if row else default
+
+    def save(self):
+        self.conn.commit()
+
+    def search(self, query, previous=None, category=None):
+        return SqliteSearchResult(self, query.lower(), category)
+
+    def stage_import(self, frame, update_existing=False):
+        """Import on the worker thread through a private connection; returns (added, updated) counts."""
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = zip(frame["model"].tolist(), frame["desc"].tolist(), frame["category"].tolist())
+            return upsert_components(conn, rows, update_existing)
+        finally:
+            conn.close()
+
+    def commit_import(self, staged):
+        return staged
+
+
+def upsert_components(conn, rows, update_existing):
+    """Bulk-load (model, description, category) rows; returns (added, updated) counts.
+
+    Rows go through a temp table so new models and changed descriptions are
+    found with two set-based statements instead of a lookup per row.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS import_rows (model TEXT PRIMARY KEY, description TEXT, category TEXT)")
+    conn.execute("DELETE FROM import_rows")
+    conn.executemany("INSERT OR IGNORE INTO import_rows VALUES (?, ?, ?)", rows)
+    added = conn.execute("INSERT OR IGNORE INTO components(model, description, category) "
+                         "SELECT model, description, category FROM import_rows").rowcount
+    updated = 0
+    if update_existing:
+        updated = conn.execute("""
+            UPDATE components SET
+                description = (SELECT i.description FROM import_rows i WHERE i.model = components.model),
+                category = coalesce((SELECT i.category FROM import_rows i WHERE i.model = components.model), category)
+            WHERE EXISTS (
+                SELECT 1 FROM import_rows i WHERE i.model = components.model AND (
+                    i.description IS NOT components.description OR
+                    (i.category IS NOT NULL AND i.category IS NOT components.category))
+            )
+        """).rowcount
+    conn.execute("DELETE FROM import_rows")
+    conn.commit()
+    return added, updated
+
+
+def open_component_catalogue():
+    if USE_SQLITE_CATALOGUE:
+        try:
+            return SqliteCatalogue()
+        except Exception as e:  # no FTS5 / trigram tokenizer in this SQLite build
+            print("SQLite catalogue unavailable, using JSON:", e)
+    return JsonCatalogue()
+# ====== End Component Catalogue ======
+
+
+# ====== Edit History ======
+# Undo/redo keeps small command dicts that reference the model objects they
+# changed plus just the state needed to flip them (coords, item, list index),
+# so applying or reverting one only touches that object's canvas items. The
+# history holds at most UNDO_LIMIT commands (PANEL_DESIGNER_UNDO_LIMIT);
+# the oldest are dropped first. Commands carrying the same "merge" key that
+# arrive within UNDO_MERGE_MS of each other (e.g. nudging a busbar with a
+# few quick drags) are coalesced into one.
+try:
+    UNDO_LIMIT = max(1, int(os.environ.get("PANEL_DESIGNER_UNDO_LIMIT", "200")))
+except ValueError:
+    UNDO_LIMIT = 200
+UNDO_MERGE_MS = 500
+
+
+class EditHistory:
+    def __init__(self, limit=UNDO_LIMIT, merge_ms=UNDO_MERGE_MS):
+        self.done = deque(maxlen=limit)
+        self.undone = []
+        self.merge_ms = merge_ms
+        self._last_push = 0.0
+
+    def push(self, command):
+        now = time.monotonic()
+        last = self.done[-1] if self.done else None
+        if (last is not None and command.get("merge") is not None and last.get("merge") == command["merge"]
+                and not self.undone and (now - self._last_push) * 1000 <= self.merge_ms):
+            last["after"] = command["after"]
+            if last["after"] == last["before"]:
+                self.done.pop()
+        else:
+            self.done.append(command)
+        self._last_push = now
+        self.undone.clear()
+
+    def undo(self):
+        if not self.done:
+            return None
+        command = self.done.pop()
+        self.undone.append(command)
+        return command
+
+    def redo(self):
+        if not self.undone:
+            return None
+        command = self.undone.pop()
+        self.done.append(command)
+        return command
+
+    def clear(self):
+        self.done.clear()
+        self.undone.clear()
+
+
+def remove_at(items, obj, index):
+    """Remove obj from items, checking the recorded index first and comparing by identity."""
+    if not (index < len(items) and items[index] is obj):
+        index = next(i for i, x in enumerate(items) if x is obj)
+    del items[index]
+# ====== End Edit History ======
+
+
+def boxes_overlap(a, b):
+    """True if the (x1, y1, x2, y2) boxes a and b intersect."""
+    return (min(a[0], a[2]) <= b[2] and max(a[0], a[2]) >= b[0] and
+            min(a[1], a[3]) <= b[3] and max(a[1], a[3]) >= b[1])
+
+
 class Tooltip:
     def __init__(self, canvas, text):
         self.canvas = canvas
@@ -144,6 +2232,113 @@ class Tooltip:
             self.tip_window = None
 
 
+class VirtualListbox(tk.Frame):
+    """Listbox that only materialises the rows currently in view.
+
+    Rows come from fetch(start, stop) and are kept as data; format_row turns
+    a row into its display string. The scrollbar is driven by the total row
+    count, and rows are fetched again whenever the view moves.
+    """
+
+    def __init__(self, master, format_row=str, **kwargs):
+        super().__init__(master)
+        self.format_row = format_row
+        self.count = 0
+        self.fetch = lambda start, stop: []
+        self.offset = 0
+        self.visible = 1
+        self.rows = []
+        self.selected = None
+
+        self.listbox = tk.Listbox(self, activestyle="none", exportselection=False, **kwargs)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        font = tkfont.Font(font=self.listbox.cget("font"))
+        # Tk listbox line height: linespace + 1 + 2 * selectborderwidth
+        self.row_height = font.metrics("linespace") + 1 + 2 * int(self.listbox.cget("selectborderwidth"))
+
+        self.listbox.bind("<Configure>", self._on_configure)
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<MouseWheel>", self._on_wheel)
+        self.listbox.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.listbox.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.listbox.bind("<Up>", lambda e: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda e: self._move_selection(1))
+        self.listbox.bind("<Prior>", lambda e: self._scroll_by(-self.visible))
+        self.listbox.bind("<Next>", lambda e: self._scroll_by(self.visible))
+
+    def set_source(self, count, fetch):
+        self.count = count
+        self.fetch = fetch
+        self.offset = 0
+        self.selected = None
+        self._render()
+
+    def selected_row(self):
+        if self.selected is None:
+            return None
+        rows = self.fetch(self.selected, self.selected + 1)
+        return rows[0] if rows else None
+
+    def bind_activate(self, callback):
+        self.listbox.bind("<Double-Button-1>", lambda e: callback())
+        self.listbox.bind("<Return>", lambda e: callback())
+
+    def _render(self):
+        self.offset = max(0, min(self.offset, self.count - self.visible))
+        self.rows = self.fetch(self.offset, self.offset + self.visible)
+        self.listbox.delete(0, tk.END)
+        for row in self.rows:
+            self.listbox.insert(tk.END, self.format_row(row))
+        if self.selected is not None and self.offset <= self.selected < self.offset + len(self.rows):
+            self.listbox.selection_set(self.selected - self.offset)
+        if self.count:
+            self.scrollbar.set(self.offset / self.count, min(1.0, (self.offset + self.visible) / self.count))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_configure(self, event):
+        visible = max(1, event.height // self.row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self._render()
+
+    def _on_select(self, event):
+        sel = self.listbox.curselection()
+        if sel:
+            self.selected = self.offset + sel[0]
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * self.count)
+        elif args[0] == "scroll":
+            step = self.visible if args[2] == "pages" else 1
+            self.offset += int(args[1]) * step
+        self._render()
+
+    def _scroll_by(self, rows):
+        self.offset += rows
+        self._render()
+        return "break"
+
+    def _on_wheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _move_selection(self, step):
+        if not self.count:
+            return "break"
+        current = self.selected if self.selected is not None else self.offset - step
+        self.selected = max(0, min(self.count - 1, current + step))
+        if self.selected < self.offset:
+            self.offset = self.selected
+        elif self.selected >= self.offset + self.visible:
+            self.offset = self.selected - self.visible + 1
+        self._render()
+        return "break"
+
+
 class PanelDesigner:
     def __init__(self, root, customer, project, ref):
         self.root = root
@@ -156,8 +2351,8 @@ class PanelDesigner:
         except Exception:
             pass
 
-        self.breaker_types = self.load_breaker_types()
-        self.busbar_data = self.load_busbar_data()
+        self.catalogue = self.load_breaker_types()
+        self.busbar_catalogue = self.load_busbar_catalogue()
         self.saved_panels = self.load_saved_panels()
         self.panel_name = None
         self.panel_depth = None  # store panel depth (mm)
@@ -165,9 +2360,20 @@ class PanelDesigner:
         self.busbars = []
         self.tooltip = None
         self.icon_image = None
-        self.drag_data = {"item": None, "x": 0, "y": 0}
-        self.undo_stack = []
+        self.drag_data = {"item": None, "x": 0, "y": 0, "dx": 0, "dy": 0, "start": None, "after": None}
+        self.item_models = {}  # canvas item id -> (role, model, owner) for event dispatch
+        self.busbar_handles = {}  # busbar line id -> resize handle id
+        self.hover_item = None
+        self.history = EditHistory()
         self.footer_ids = []  # track footer elements for theme refresh
+        self._font_cache = {}
+        self._layout_cache = {}
+        self._render_gen = 0
+        self._render_after = None
+        self._viewport_after = None
+        self._scroll_region = None
+        self._bom_job = None  # cancel event of the running BOM job, if any
+        self.zoom = 1.0  # canvas pixels per model unit; the model itself is never rescaled
 
         # THEME STATE
         self.is_dark_mode = False
@@ -198,26 +2404,50 @@ class PanelDesigner:
         tk.Button(top_frame, text="Upload Breaker Types", command=self.load_breaker_excel).pack(side=tk.LEFT, padx=5)
         tk.Button(top_frame, text="Save Panel", command=self.save_panel).pack(side=tk.LEFT, padx=5)
         tk.Button(top_frame, text="Generate BOM", command=self.generate_bom).pack(side=tk.LEFT, padx=5)
-        tk.Button(top_frame, text="Undo", command=self.undo_last_action).pack(side=tk.LEFT, padx=5)
-        tk.Button(top_frame, text="Update Software", command=update_software).pack(side=tk.LEFT, padx=5)
+        self.undo_button = tk.Button(top_frame, text="Undo", command=self.undo_last_action, state=tk.DISABLED)
+        self.undo_button.pack(side=tk.LEFT, padx=5)
+        self.redo_button = tk.Button(top_frame, text="Redo", command=self.redo_last_action, state=tk.DISABLED)
+        self.redo_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(top_frame, text="Fit", command=self.zoom_to_fit).pack(side=tk.LEFT, padx=5)
+        self.update_button = tk.Button(top_frame, text="Update Software", command=lambda: update_software(self.root))
+        self.update_button.pack(side=tk.LEFT, padx=5)
+        self.root.after(1000, self.poll_update_check)
 
         # === NEW: Dark/Light mode toggle as a Checkbutton ===
         self.dark_mode_var = tk.BooleanVar(value=False)
         self.dark_toggle = ttk.Checkbutton(top_frame, text="Dark Mode", variable=self.dark_mode_var, command=self.toggle_theme_check)
         self.dark_toggle.pack(side=tk.RIGHT, padx=5)
+        self.render_progress = ttk.Progressbar(top_frame, length=120, mode="determinate")  # shown while a big panel draws
 
         canvas_frame = tk.Frame(root)
         canvas_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        self.canvas = tk.Canvas(canvas_frame, bg="lightgray", width=1000, height=600, scrollregion=(0, 0, 5000, 3000))
+        self.canvas = tk.Canvas(canvas_frame, bg="lightgray", width=1000, height=600, scrollregion=(0, 0, 1000, 600))
         h_scroll = tk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
         v_scroll = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
-        self.canvas.configure(xscrollcommand=h_scroll.set, yscrollcommand=v_scroll.set)
+        self.canvas.configure(xscrollcommand=lambda *args: self.on_canvas_view(h_scroll, *args),
+                              yscrollcommand=lambda *args: self.on_canvas_view(v_scroll, *args))
 
         h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
         v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
+        self.canvas.bind("<ButtonPress-1>", self.on_canvas_press)
+        self.canvas.bind("<B1-Motion>", self.on_canvas_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.on_canvas_release)
+        self.canvas.bind("<Motion>", self.on_canvas_hover)
+        self.canvas.bind("<Leave>", lambda e: self.set_hover_item(None, e))
+        # <Control-Z> is also what Ctrl+Z sends with Caps Lock on, so it only redoes when Shift is held
+        self.root.bind("<Control-z>", lambda e: self.undo_last_action())
+        self.root.bind("<Control-Z>", lambda e: self.redo_last_action() if e.state & 0x1 else self.undo_last_action())
+        for sequence in ("<Control-Shift-Z>", "<Control-Shift-z>", "<Control-y>", "<Control-Y>"):
+            self.root.bind(sequence, lambda e: self.redo_last_action())
+        self.canvas.bind("<Control-MouseWheel>", lambda e: self.zoom_at(e, 1 if e.delta > 0 else -1))
+        self.canvas.bind("<Control-Button-4>", lambda e: self.zoom_at(e, 1))
+        self.canvas.bind("<Control-Button-5>", lambda e: self.zoom_at(e, -1))
+        self.canvas.bind("<ButtonPress-2>", lambda e: self.canvas.scan_mark(e.x, e.y))
+        self.canvas.bind("<B2-Motion>", lambda e: self.canvas.scan_dragto(e.x, e.y, gain=1))
+
         self.apply_theme()
         self.add_bottom_right_info()
 
@@ -235,63 +2465,48 @@ class PanelDesigner:
         padding = 10
 
         icon_path = resource_path("Hssp.ico")
-        if os.path.exists(icon_path):
+        if self.icon_image is None and os.path.exists(icon_path):
             try:
                 img = Image.open(icon_path)
                 img = img.resize((32, 32))
-                self.icon_image = ImageTk.PhotoImage(img)
-                self.footer_ids.append(self.canvas.create_image(canvas_width - 40, canvas_height - 60, image=self.icon_image, anchor="se"))
+                self.icon_image = ImageTk.PhotoImage(img)  # decoded once per session
             except Exception:
                 pass
+        if self.icon_image is not None:
+            self.footer_ids.append(self.canvas.create_image(canvas_width - 40, canvas_height - 60, image=self.icon_image, anchor="se"))
 
         self.footer_ids.append(self.canvas.create_text(canvas_width - padding, canvas_height - 30,
-                                text="hsspcreations@gmail.com", font=("Arial", 10), fill=self.palette["muted_text"], anchor="se"))
+                                text="hsspcreations@gmail.com", font=("Arial", 10), fill=self.palette["muted_text"], anchor="se", tags=("footer-text",)))
         self.footer_ids.append(self.canvas.create_text(canvas_width - padding, canvas_height - 10,
-                                text="0764319139", font=("Arial", 10), fill=self.palette["muted_text"], anchor="se"))
+                                text="0764319139", font=("Arial", 10), fill=self.palette["muted_text"], anchor="se", tags=("footer-text",)))
+
+    def poll_update_check(self):
+        available = update_available()
+        if available is None:
+            self.root.after(1000, self.poll_update_check)
+        elif available:
+            self.update_button.configure(text="Update Available")
 
     def load_breaker_types(self):
-        if os.path.exists(BREAKER_FILE):
-            try:
-                with open(BREAKER_FILE, "r") as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+        return open_component_catalogue()
 
     def save_breaker_types(self):
-        with open(BREAKER_FILE, "w") as f:
-            json.dump(self.breaker_types, f)
+        self.catalogue.save()
 
-    def load_busbar_data(self):
+    def load_busbar_catalogue(self):
         try:
-            df = pd.read_csv(BUSBAR_DATA_FILE)
-            return df
+            return load_busbar_catalogue()
         except FileNotFoundError:
             messagebox.showerror("Error", f"Busbar data file not found at: {BUSBAR_DATA_FILE}")
-            return pd.DataFrame()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load busbar data: {e}")
-            return pd.DataFrame()
+        return BusbarCatalogue([], [], [])
 
     def project_key(self):
         return f"{self.customer}_{self.project}_{self.ref}"
 
     def load_saved_panels(self):
-        os.makedirs(PANELS_FOLDER, exist_ok=True)
-        panels = []
-        for file in os.listdir(PANELS_FOLDER):
-            if file.endswith(".json"):
-                try:
-                    with open(f"{PANELS_FOLDER}/{file}", "r") as f:
-                        data = json.load(f)
-                        pinfo = data.get("project_info", {})
-                        if (pinfo.get("customer") == self.customer and
-                                pinfo.get("project") == self.project and
-                                pinfo.get("ref") == self.ref):
-                            panels.append(file[:-5])
-                except Exception:
-                    continue
-        return panels
+        return panels_for_project(self.customer, self.project, self.ref)
 
     def refresh_panel_menu(self):
         self.saved_panels = self.load_saved_panels()
@@ -344,9 +2559,11 @@ class PanelDesigner:
             self.panel_name = name
             self.panel_depth = depth
 
+            self.cancel_render()
             self.cubicles.clear()
             self.busbars.clear()
-            self.canvas.delete("all")
+            self.clear_canvas()
+            self.clear_history()
             self.panel_var.set(name)
             self.apply_theme()
             self.add_bottom_right_info()
@@ -390,11 +2607,13 @@ class PanelDesigner:
                 x = last["x"] + last["width"] * SCALE
                 y = last["y"]
 
-            rect = self.canvas.create_rectangle(x, y, x + w, y + h, fill=self.palette["cubicle_fill"], outline=self.palette["cubicle_outline"], width=3)
-
-            cubicle_data = {"id": rect, "width": width, "height": height, "x": x, "y": y, "compartments": []}
+            cubicle_data = {"id": None, "width": width, "height": height, "x": x, "y": y,
+                            "coords": [x, y, x + w, y + h], "compartments": []}
+            self.draw_cubicle(cubicle_data)
+            self.raise_overlays()
             self.cubicles.append(cubicle_data)
-            self.undo_stack.append({"type": "add_cubicle", "cubicle": cubicle_data})
+            self.update_scroll_region()
+            self.push_command({"type": "add_cubicle", "cubicle": cubicle_data, "index": len(self.cubicles) - 1})
 
             self.ask_compartments(cubicle_data)
             top.destroy()
@@ -408,10 +2627,9 @@ class PanelDesigner:
             messagebox.showwarning("Delete Cubicle", "No cubicles to delete.")
             return
         cubicle = self.cubicles.pop()
-        self.canvas.delete(cubicle["id"])
-        for comp in cubicle["compartments"]:
-            for sec in comp["sections"]:
-                self.canvas.delete(sec["id"])
+        self.undraw_cubicle(cubicle)
+        self.update_scroll_region()
+        self.push_command({"type": "delete_cubicle", "cubicle": cubicle, "index": len(self.cubicles)})
         messagebox.showinfo("Delete Cubicle", "Last added cubicle deleted successfully!")
 
     def ask_compartments(self, cubicle):
@@ -419,53 +2637,419 @@ class PanelDesigner:
         if num:
             self.create_compartments(cubicle, num)
 
-    def create_compartments(self, cubicle, num):
-        coords = self.canvas.coords(cubicle["id"])
-        x1, y1, x2, y2 = coords
+    def build_compartments(self, cubicle, num):
+        """Append num compartments to the cubicle model, with section geometry but no canvas items."""
+        x1, y1, x2, y2 = cubicle["coords"]
         compartment_height = (y2 - y1) / num
+        section_width = (x2 - x1) / len(SECTION_NAMES)
 
+        added = []
         for _ in range(num):
             comp_y1 = y1 + len(cubicle["compartments"]) * compartment_height
             comp_y2 = comp_y1 + compartment_height
             compartment = {"sections": []}
-
-            section_width = (x2 - x1) / len(SECTION_NAMES)
             for j, section_name in enumerate(SECTION_NAMES):
                 sec_x1 = x1 + j * section_width
                 sec_x2 = sec_x1 + section_width
-                section_rect = self.canvas.create_rectangle(sec_x1, comp_y1, sec_x2, comp_y2, fill=self.palette["section_empty"], outline=self.palette["section_outline"])
-                self.canvas.tag_bind(section_rect, "<Button-1>",
-                                     lambda e, s=section_name, r=section_rect, c=compartment: self.select_item(s, r, c))
-                compartment["sections"].append({"name": section_name, "id": section_rect, "item": None})
-
+                compartment["sections"].append({"name": section_name, "id": None, "item": None,
+                                                "coords": [sec_x1, comp_y1, sec_x2, comp_y2]})
             cubicle["compartments"].append(compartment)
+            added.append(compartment)
+        return added
+
+    def create_compartments(self, cubicle, num):
+        for compartment in self.build_compartments(cubicle, num):
+            self.draw_compartment(compartment)
+        self.raise_overlays()
+
+    def draw_compartment(self, compartment):
+        for section in compartment["sections"]:
+            fill = self.palette["section_selected"] if section["item"] else self.palette["section_empty"]
+            role = "section-filled" if section["item"] else "section-empty"
+            section_rect = self.canvas.create_rectangle(*self.to_canvas(section["coords"]), fill=fill, outline=self.palette["section_outline"], tags=("content", role))
+            self.item_models[section_rect] = ("section", section, compartment)
+            section["id"] = section_rect
+            if section["item"]:
+                self.draw_vertical_text_in_section(section, section["item"]["model"], section["item"].get("desc", ""))
+
+    def set_section_item(self, section, item):
+        """Put item ({"model", "desc"} or None) into a section, redrawing only that section's label."""
+        old = section.get("item")
+        if old:
+            self.delete_items(old.get("text_ids") or [])
+        section["item"] = {"model": item["model"], "desc": item.get("desc", ""), "text_ids": []} if item else None
+        self.set_section_filled(section, bool(item))
+        if item and section["id"] is not None:
+            self.draw_vertical_text_in_section(section, item["model"], item.get("desc", ""))
+            self.raise_overlays()
+
+    def set_section_filled(self, section, filled):
+        """Recolour a drawn section and move it to the matching role tag."""
+        if section["id"] is None:
+            return
+        role = "section-filled" if filled else "section-empty"
+        self.canvas.itemconfig(section["id"], tags=("content", role),
+                               fill=self.palette["section_selected"] if filled else self.palette["section_empty"])
+
+    def raise_overlays(self):
+        """Keep busbars, their resize handles and the footer above cubicles and labels drawn after them."""
+        for tag in ("busbar", "terminal", "handle"):
+            self.canvas.tag_raise(tag)
+        for footer_id in self.footer_ids:
+            self.canvas.tag_raise(footer_id)
+
+    def draw_cubicle(self, cubicle):
+        cubicle["id"] = self.canvas.create_rectangle(*self.to_canvas(cubicle["coords"]), fill=self.palette["cubicle_fill"], outline=self.palette["cubicle_outline"], width=3, tags=("content", "cubicle"))
+        for compartment in cubicle["compartments"]:
+            self.draw_compartment(compartment)
+
+    def delete_cubicle_items(self, cubicle):
+        ids = [cubicle["id"]]
+        for comp in cubicle["compartments"]:
+            for sec in comp["sections"]:
+                ids.append(sec["id"])
+                if sec.get("item"):
+                    ids.extend(sec["item"].get("text_ids") or [])
+        self.delete_items(ids)
+
+    def draw_busbar(self, busbar):
+        if busbar.get("busbar_size"):
+            color, role = self.palette["busbar_terminal"], "terminal"
+        else:
+            color, role = self.palette["busbar"], "busbar"
+        coords = self.to_canvas(busbar["coords"])
+        line = self.canvas.create_line(*coords, fill=color, width=4, tags=("content", role))
+        self.canvas.tag_raise(line)
+        busbar["id"] = line
+        self.item_models[line] = ("busbar", busbar, None)
+        size = self.BUSBAR_HANDLE_SIZE
+        handle = self.canvas.create_rectangle(coords[2] - size, coords[3] - size, coords[2] + size, coords[3] + size,
+                                              fill=self.palette["handle"], tags=("handle",))
+        self.busbar_handles[line] = handle
+        self.item_models[handle] = ("handle", busbar, None)
+
+    BUSBAR_HANDLE_SIZE = 6
+
+    def add_busbar(self, busbar):
+        self.busbars.append(busbar)
+        self.draw_busbar(busbar)
+        self.push_command({"type": "add_busbar", "busbar": busbar, "index": len(self.busbars) - 1})
+        self.update_scroll_region()
+
+    def delete_items(self, ids):
+        """Delete canvas items and forget their model entries."""
+        for item_id in ids:
+            if item_id is None:
+                continue
+            self.canvas.delete(item_id)
+            self.item_models.pop(item_id, None)
+            handle_id = self.busbar_handles.pop(item_id, None)
+            if handle_id is not None:
+                self.canvas.delete(handle_id)
+                self.item_models.pop(handle_id, None)
+            if item_id == self.hover_item:
+                self.set_hover_item(None)
+
+    def clear_canvas(self):
+        self.canvas.delete("all")
+        self.item_models.clear()
+        self.busbar_handles.clear()
+        self.set_hover_item(None)
+        self.end_drag()
+
+    # ---------- CANVAS EVENT DISPATCH ----------
+    # One set of canvas bindings serves every item: the item under the
+    # pointer is resolved through item_models, so the cost of an event does
+    # not grow with the number of sections, labels or busbars on the panel.
+    def model_at_pointer(self):
+        current = self.canvas.find_withtag("current")
+        if not current:
+            return None, None
+        return current[0], self.item_models.get(current[0])
+
+    def on_canvas_press(self, event):
+        item_id, entry = self.model_at_pointer()
+        if entry is None:
+            return
+        role, model, owner = entry
+        if role == "section":
+            self.select_item(model["name"], item_id, owner)
+        elif role in ("busbar", "handle"):
+            self.end_drag()
+            self.drag_data.update(item=entry, x=event.x, y=event.y, dx=0, dy=0, start=list(model["coords"]))
+
+    # Motion events only accumulate the pointer offset; the canvas is
+    # updated at most once per DRAG_FRAME_MS, and the busbar model and its
+    # undo command are written once, when the button is released.
+    DRAG_FRAME_MS = 16
+
+    def on_canvas_drag(self, event):
+        drag = self.drag_data
+        if drag["item"] is None:
+            return
+        drag["dx"] += event.x - drag["x"]
+        drag["dy"] += event.y - drag["y"]
+        drag["x"] = event.x
+        drag["y"] = event.y
+        if drag["after"] is None:
+            drag["after"] = self.root.after(self.DRAG_FRAME_MS, self.flush_drag)
+
+    def dragged_coords(self):
+        role, busbar, _ = self.drag_data["item"]
+        dx, dy = self.drag_data["dx"] / self.zoom, self.drag_data["dy"] / self.zoom
+        x1, y1, x2, y2 = self.drag_data["start"]
+        if role == "busbar":
+            return [x1 + dx, y1 + dy, x2 + dx, y2 + dy]
+        if busbar["type"] == "vertical":
+            return [x1, y1, x2, y2 + dy]
+        return [x1, y1, x2 + dx, y2]
+
+    def flush_drag(self):
+        self.drag_data["after"] = None
+        if self.drag_data["item"] is not None:
+            self.place_busbar(self.drag_data["item"][1], self.dragged_coords())
+
+    def on_canvas_release(self, event):
+        drag = self.drag_data
+        if drag["item"] is None:
+            return
+        role, busbar, _ = drag["item"]
+        coords = self.dragged_coords()
+        previous = drag["start"]
+        self.end_drag()
+        self.place_busbar(busbar, coords)
+        if coords != previous:
+            busbar["coords"] = coords
+            kind = "resize_busbar" if role == "handle" else "move_busbar"
+            self.push_command({"type": kind, "busbar": busbar, "before": previous, "after": coords,
+                               "merge": (kind, id(busbar))})
+            self.update_scroll_region()
+
+    def end_drag(self):
+        if self.drag_data["after"] is not None:
+            self.root.after_cancel(self.drag_data["after"])
+        self.drag_data.update(item=None, dx=0, dy=0, start=None, after=None)
+
+    def on_canvas_hover(self, event):
+        item_id, entry = self.model_at_pointer()
+        text = None
+        if entry is not None and entry[0] == "label":
+            text = entry[1]
+        elif entry is not None and entry[0] == "section":
+            item = entry[1].get("item")
+            # sections too small for a label show the component on hover instead
+            if item and not item.get("text_ids"):
+                text = f"{item['model']}: {item.get('desc', '')}"
+        if text is None:
+            item_id = None
+        if item_id != self.hover_item:
+            self.set_hover_item(item_id, event, text)
+
+    def set_hover_item(self, item_id, event=None, text=None):
+        """Show a tooltip while the pointer is over a section label (or an unlabelled filled section)."""
+        if self.hover_item is not None:
+            self.hide_tooltip()
+        self.hover_item = item_id
+        if item_id is not None and event is not None:
+            self.show_tooltip(event, text)
+
+    # ---------- BATCHED RENDERING ----------
+    # Opening a panel builds the whole model first and then creates canvas
+    # items RENDER_BATCH_SIZE objects per Tk tick, with a progress bar for
+    # big panels, so the window keeps painting and responding while it loads.
+    RENDER_BATCH_SIZE = 10
+
+    def cancel_render(self):
+        self._render_gen += 1
+        if self._render_after is not None:
+            try:
+                self.root.after_cancel(self._render_after)
+            except Exception:
+                pass
+            self._render_after = None
+        self.render_progress.pack_forget()
+
+    def render_model(self):
+        """Bring the canvas in line with the model and the viewport, drawing in batches.
+
+        Cubicles near the visible area that have no canvas items yet are
+        drawn; cubicles well outside it are dropped from the canvas again.
+        """
+        self.cancel_render()
+        gen = self._render_gen
+        self.update_scroll_region()
+        near = [v / self.zoom for v in self.viewport_bounds(self.VIEWPORT_MARGIN)]
+        far = [v / self.zoom for v in self.viewport_bounds(2 * self.VIEWPORT_MARGIN)]
+        pending = []
+        for cub in self.cubicles:
+            if cub["id"] is None:
+                if boxes_overlap(cub["coords"], near):
+                    pending.append((self.draw_cubicle, cub))
+            elif not boxes_overlap(cub["coords"], far):
+                self.undraw_cubicle(cub)
+        pending += [(self.draw_busbar, b) for b in self.busbars if b.get("id") is None]
+        total = len(pending)
+        if total > self.RENDER_BATCH_SIZE:
+            self.render_progress.configure(maximum=total, value=0)
+            self.render_progress.pack(side=tk.RIGHT, padx=5)
+
+        def step(start):
+            self._render_after = None
+            if gen != self._render_gen:
+                return
+            for draw, obj in pending[start:start + self.RENDER_BATCH_SIZE]:
+                draw(obj)
+            self.raise_overlays()
+            done = start + self.RENDER_BATCH_SIZE
+            if done < total:
+                self.render_progress.configure(value=done)
+                self._render_after = self.root.after(1, step, done)
+            else:
+                self.render_progress.pack_forget()
+
+        step(0)
+
+    # ---------- VIEWPORT ----------
+    # Only cubicles within VIEWPORT_MARGIN pixels of the visible area exist
+    # as canvas items; scrolling re-runs render_model (coalesced to one pass
+    # per VIEWPORT_REFRESH_MS) to materialise or drop cubicles as needed.
+    VIEWPORT_MARGIN = 200
+    VIEWPORT_REFRESH_MS = 30
+    SCROLL_PADDING = 100
+
+    def viewport_bounds(self, margin=0):
+        x0 = self.canvas.canvasx(0)
+        y0 = self.canvas.canvasy(0)
+        width = max(self.canvas.winfo_width(), int(self.canvas["width"]))
+        height = max(self.canvas.winfo_height(), int(self.canvas["height"]))
+        return [x0 - margin, y0 - margin, x0 + width + margin, y0 + height + margin]
+
+    def on_canvas_view(self, scrollbar, first, last):
+        scrollbar.set(first, last)
+        if self._viewport_after is None:
+            self._viewport_after = self.root.after(self.VIEWPORT_REFRESH_MS, self.refresh_viewport)
+
+    def refresh_viewport(self):
+        self._viewport_after = None
+        self.render_model()
+
+    def content_bounds(self):
+        """Bounding box of every cubicle and busbar in the model, or None for an empty panel."""
+        boxes = [cub["coords"] for cub in self.cubicles] + [b["coords"] for b in self.busbars]
+        if not boxes:
+            return None
+        return [min(min(b[0], b[2]) for b in boxes), min(min(b[1], b[3]) for b in boxes),
+                max(max(b[0], b[2]) for b in boxes), max(max(b[1], b[3]) for b in boxes)]
+
+    def update_scroll_region(self):
+        bounds = self.to_canvas(self.content_bounds() or [0, 0, 0, 0])
+        pad = self.SCROLL_PADDING
+        region = (min(0, bounds[0] - pad), min(0, bounds[1] - pad),
+                  max(int(self.canvas["width"]), bounds[2] + pad), max(int(self.canvas["height"]), bounds[3] + pad))
+        if region != self._scroll_region:
+            self._scroll_region = region
+            self.canvas.configure(scrollregion=region)
+
+    def undraw_cubicle(self, cubicle):
+        self.delete_cubicle_items(cubicle)
+        cubicle["id"] = None
+        for comp in cubicle["compartments"]:
+            for sec in comp["sections"]:
+                sec["id"] = None
+                if sec.get("item"):
+                    sec["item"]["text_ids"] = []
+
+    # ---------- ZOOM & PAN ----------
+    # Canvas coordinates are model coordinates times self.zoom. Zooming
+    # rescales the existing rectangles and lines in place with canvas.scale
+    # on the "content" tag (about the origin, so that relation holds) and
+    # only re-lays out the section labels, whose layouts are cached per size.
+    ZOOM_STEP = 1.25
+    ZOOM_MIN = 0.1
+    ZOOM_MAX = 8.0
+
+    def to_canvas(self, coords):
+        return [c * self.zoom for c in coords]
+
+    def set_zoom(self, zoom):
+        zoom = min(self.ZOOM_MAX, max(self.ZOOM_MIN, zoom))
+        factor = zoom / self.zoom
+        if abs(factor - 1) < 1e-9:
+            return False
+        self.zoom = zoom
+        self.canvas.scale("content", 0, 0, factor, factor)
+        for busbar in self.busbars:
+            self.place_busbar(busbar, busbar["coords"])  # handles keep their pixel size
+        for cub in self.cubicles:
+            if cub["id"] is None:
+                continue
+            for comp in cub["compartments"]:
+                for sec in comp["sections"]:
+                    if sec.get("item"):
+                        self.draw_vertical_text_in_section(sec, sec["item"]["model"], sec["item"].get("desc", ""))
+        self.raise_overlays()
+        self.update_scroll_region()
+        return True
+
+    def zoom_at(self, event, direction):
+        """Zoom one step in (direction > 0) or out, keeping the point under the pointer in place."""
+        model_x = self.canvas.canvasx(event.x) / self.zoom
+        model_y = self.canvas.canvasy(event.y) / self.zoom
+        if self.set_zoom(self.zoom * (self.ZOOM_STEP if direction > 0 else 1 / self.ZOOM_STEP)):
+            self.scroll_to(model_x * self.zoom - event.x, model_y * self.zoom - event.y)
+
+    def zoom_to_fit(self):
+        bounds = self.content_bounds()
+        if bounds is None:
+            return
+        vx1, vy1, vx2, vy2 = self.viewport_bounds()
+        view_w, view_h = vx2 - vx1, vy2 - vy1
+        pad = self.SCROLL_PADDING / 2
+        content_w = max(bounds[2] - bounds[0], 1)
+        content_h = max(bounds[3] - bounds[1], 1)
+        self.set_zoom(min((view_w - 2 * pad) / content_w, (view_h - 2 * pad) / content_h))
+        self.scroll_to(bounds[0] * self.zoom - pad, bounds[1] * self.zoom - pad)
+
+    def scroll_to(self, x, y):
+        """Scroll so canvas point (x, y) is at the top-left corner of the view."""
+        self.update_scroll_region()
+        rx1, ry1, rx2, ry2 = self._scroll_region
+        self.canvas.xview_moveto((x - rx1) / max(rx2 - rx1, 1))
+        self.canvas.yview_moveto((y - ry1) / max(ry2 - ry1, 1))
 
     def select_item(self, section_name, section_rect, compartment):
         self.show_search_popup(section_name, section_rect, compartment)
 
     # ---------- TEXT FITTING HELPERS ----------
-    def _compute_text_layout(self, section_rect, font_name=("Arial", 6)):
-        coords = self.canvas.coords(section_rect)
-        x1, y1, x2, y2 = coords
-        width = max(1, x2 - x1)
-        height = max(1, y2 - y1)
-
+    # Fonts and their metrics are cached per (family, size), and finished
+    # label layouts per (section width, section height, text), so redrawing
+    # many sections of the same size never creates or measures fonts again.
+    LAYOUT_CACHE_LIMIT = 4096
+
+    def _font_metrics(self, family, size):
+        key = (family, size)
+        cached = self._font_cache.get(key)
+        if cached is None:
+            fnt = tkfont.Font(family=family, size=size)
+            cached = (fnt, max(1, fnt.metrics("linespace")), max(1, fnt.measure("W")))
+            self._font_cache[key] = cached
+        return cached
+
+    def _compute_text_layout(self, width, height, font_name=("Arial", 6)):
+        width = max(1, width)
+        height = max(1, height)
+
+        family = font_name[0] if isinstance(font_name, tuple) else "Arial"
         size = font_name[1] if isinstance(font_name, tuple) else 6
         # Attempt to find a font size that fits at least one column
         for fs in range(int(size), 3, -1):
-            fnt = tkfont.Font(family=font_name[0] if isinstance(font_name, tuple) else "Arial", size=fs)
-            line_h = max(1, fnt.metrics("linespace"))
-            char_w = max(1, fnt.measure("W"))
+            fnt, line_h, char_w = self._font_metrics(family, fs)
             max_lines = max(1, int(height // line_h))
-            if max_lines < 1:
-                continue
             # For a single column: need char_w width
             if char_w <= width:
                 return fnt, line_h, char_w, max_lines
         # Fallback minimal font
-        fnt = tkfont.Font(family="Arial", size=4)
-        line_h = max(1, fnt.metrics("linespace"))
-        char_w = max(1, fnt.measure("W"))
+        fnt, line_h, char_w = self._font_metrics("Arial", 4)
         max_lines = max(1, int(height // line_h))
         return fnt, line_h, char_w, max_lines
 
@@ -477,6 +3061,35 @@ class PanelDesigner:
             chunks.append(text[i:i + max_lines])
         return chunks
 
+    def _vertical_text_layout(self, width, height, text):
+        """Memoised label layout: (font, [(x offset, column text)], truncated, ellipsis font)."""
+        key = (round(width, 2), round(height, 2), str(text))
+        layout = self._layout_cache.get(key)
+        if layout is not None:
+            return layout
+
+        fnt, line_h, char_w, max_lines = self._compute_text_layout(width, height, ("Arial", 6))
+        columns = self._split_text_into_columns(text, max_lines)
+
+        # Compute how many columns fit horizontally; if not all fit, truncate with ellipsis
+        col_gap = max(2, int(char_w * 0.5))
+        max_cols_fit = max(1, int((width + col_gap) // (char_w + col_gap)))
+        draw_columns = columns[:max_cols_fit]
+        truncated = len(columns) > max_cols_fit
+
+        # Center the columns horizontally
+        draw_width = len(draw_columns) * char_w + (len(draw_columns) - 1) * col_gap
+        start_x = (width - draw_width) / 2 + char_w / 2
+        placed = [(start_x + idx * (char_w + col_gap), "\n".join(chunk)) for idx, chunk in enumerate(draw_columns)]
+
+        layout = (fnt, placed, truncated, ("Arial", max(5, fnt.cget("size") - 1)))
+        if len(self._layout_cache) >= self.LAYOUT_CACHE_LIMIT:
+            self._layout_cache.clear()
+        self._layout_cache[key] = layout
+        return layout
+
+    LABEL_MIN_PX = 6
+
     def draw_vertical_text_in_section(self, section, text, desc):
         """Draw vertical, wrapped text that fits inside the section rectangle.
         Stores the created text item ids in section['item']['text_ids'].
@@ -485,50 +3098,36 @@ class PanelDesigner:
         # Remove existing text ids if any
         try:
             old_text_ids = section.get("item", {}).get("text_ids", [])
-            for tid in old_text_ids or []:
-                self.canvas.delete(tid)
+            self.delete_items(old_text_ids or [])
         except Exception:
             pass
 
-        coords = self.canvas.coords(section_rect)
-        x1, y1, x2, y2 = coords
-        width = x2 - x1
-
-        fnt, line_h, char_w, max_lines = self._compute_text_layout(section_rect, ("Arial", 6))
-        if max_lines < 1:
-            max_lines = 1
-        columns = self._split_text_into_columns(text, max_lines)
-
-        # Compute how many columns fit horizontally; if not all fit, truncate with ellipsis
-        col_gap = max(2, int(char_w * 0.5))
-        total_needed = len(columns) * char_w + (len(columns) - 1) * col_gap
-        max_cols_fit = max(1, int((width + col_gap) // (char_w + col_gap)))
-        draw_columns = columns[:max_cols_fit]
-        truncated = len(columns) > max_cols_fit
+        if section_rect is None:
+            return []
+        x1, y1, x2, y2 = self.to_canvas(section["coords"])
+        text_ids = []
+        if x2 - x1 < self.LABEL_MIN_PX or y2 - y1 < self.LABEL_MIN_PX:
+            # too small to read: the fill colour marks the section and hovering shows the component
+            if section.get("item"):
+                section["item"]["text_ids"] = text_ids
+            return text_ids
 
-        # Center the columns horizontally
-        draw_width = len(draw_columns) * char_w + (len(draw_columns) - 1) * col_gap
-        start_x = x1 + (width - draw_width) / 2 + char_w / 2
+        fnt, placed, truncated, ellipsis_font = self._vertical_text_layout(x2 - x1, y2 - y1, text)
         center_y = (y1 + y2) / 2
 
-        text_ids = []
-        for idx, chunk in enumerate(draw_columns):
-            col_text = "\n".join(list(chunk))
-            tx = start_x + idx * (char_w + col_gap)
-            tid = self.canvas.create_text(tx, center_y, text=col_text, font=fnt, fill=self.palette["text"], anchor="center", justify="center")
-            self.canvas.tag_bind(tid, "<Enter>", lambda e, d=desc: self.show_tooltip(e, d))
-            self.canvas.tag_bind(tid, "<Leave>", lambda e: self.hide_tooltip())
+        for offset, col_text in placed:
+            tid = self.canvas.create_text(x1 + offset, center_y, text=col_text, font=fnt, fill=self.palette["text"], anchor="center", justify="center", tags=("label",))
+            self.item_models[tid] = ("label", desc, section)
             text_ids.append(tid)
 
         # If truncated, draw a tiny ellipsis at the far right
         if truncated:
-            ellipsis_id = self.canvas.create_text(x2 - 2, y1 + 2, text="…", font=("Arial", max(5, fnt.cget("size") - 1)), fill=self.palette["text"], anchor="ne")
+            ellipsis_id = self.canvas.create_text(x2 - 2, y1 + 2, text="…", font=ellipsis_font, fill=self.palette["text"], anchor="ne", tags=("label",))
             text_ids.append(ellipsis_id)
 
         # Save text ids with the item for future cleanup/undo
         if section.get("item"):
             section["item"]["text_ids"] = text_ids
-
         return text_ids
 
     def show_search_popup(self, section_name, section_rect, compartment):
@@ -540,62 +3139,54 @@ class PanelDesigner:
         search_entry = tk.Entry(popup, textvariable=search_var)
         search_entry.pack(fill=tk.X, padx=5, pady=5)
 
-        listbox = tk.Listbox(popup)
-        listbox.pack(fill=tk.BOTH, expand=True)
+        status_var = tk.StringVar()
+        tk.Label(popup, textvariable=status_var, anchor="w", font=("Arial", 8)).pack(fill=tk.X, padx=5)
 
-        def update_list(*args):
-            search_text = search_var.get().lower()
-            listbox.delete(0, tk.END)
-            for model, desc in self.breaker_types.items():
-                if search_text in desc.lower() or search_text in model.lower():
-                    listbox.insert(tk.END, f"{desc} ({model})")
+        result_list = VirtualListbox(popup, format_row=lambda row: f"{row[1]} ({row[0]})")
+        result_list.pack(fill=tk.BOTH, expand=True)
 
-        search_var.trace("w", update_list)
+        state = {"result": None, "after": None}
+
+        def update_list():
+            state["after"] = None
+            if not popup.winfo_exists():
+                return
+            result = self.catalogue.search(search_var.get(), previous=state["result"], category=section_name)
+            state["result"] = result
+            result_list.set_source(len(result), result.page)
+            status_var.set(f"{len(result)} matches")
+
+        def schedule_update(*args):
+            # debounce keystrokes: search once typing pauses
+            if state["after"] is not None:
+                popup.after_cancel(state["after"])
+            state["after"] = popup.after(SEARCH_DEBOUNCE_MS, update_list)
+
+        search_var.trace("w", schedule_update)
         update_list()
+        search_entry.focus_set()
 
         def select_item():
-            if listbox.curselection():
-                selected = listbox.get(listbox.curselection())
-                model = selected.split("(")[-1].strip(")")
-                desc = selected.split("(")[0].strip()
-
-                self.canvas.itemconfig(section_rect, fill=self.palette["section_selected"])
-                # find the section object
-                target_section = None
-                for section in compartment["sections"]:
-                    if section["id"] == section_rect:
-                        target_section = section
-                        break
+            selected = result_list.selected_row()
+            if selected:
+                model, desc = selected
+
+                # find the section object; its canvas item may have been redrawn since the popup opened
+                target_section = next((s for s in compartment["sections"] if s["name"] == section_name), None)
                 if target_section is None:
                     popup.destroy()
                     return
-
-                # remove any previous text in this section
-                try:
-                    old_ids = target_section.get("item", {}).get("text_ids", [])
-                    for tid in old_ids or []:
-                        self.canvas.delete(tid)
-                except Exception:
-                    pass
-
-                previous_item = target_section.get("item")
-                target_section["item"] = {"model": model, "desc": desc, "text_ids": []}
-
-                # draw new text vertically to fit
-                new_text_ids = self.draw_vertical_text_in_section(target_section, model, desc)
-                target_section["item"]["text_ids"] = new_text_ids
-
-                # push undo
-                self.undo_stack.append({
-                    "type": "select_component",
-                    "section": target_section,
-                    "previous_item": previous_item,
-                    "new_text_ids": new_text_ids,
-                    "rect_id": section_rect
-                })
+                previous = target_section.get("item")
+                if previous:
+                    previous = {"model": previous["model"], "desc": previous.get("desc", "")}
+                item = {"model": model, "desc": desc}
+                self.set_section_item(target_section, item)
+                self.push_command({"type": "select_component", "section": target_section,
+                                   "before": previous, "after": item})
 
                 popup.destroy()
 
+        result_list.bind_activate(select_item)
         tk.Button(popup, text="Select", command=select_item).pack(pady=5)
 
     def show_tooltip(self, event, text):
@@ -611,19 +3202,8 @@ class PanelDesigner:
         form.title("Add Busbar Terminal")
 
         tk.Label(form, text="Busbar Size:").grid(row=0, column=0, padx=5, pady=5)
-        busbar_sizes = [
-            "20x6 Busbar (5.5m Length) LVT",
-            "25x10 Busbar (5.5m Length) LVT",
-            "32x10 Cu Busbar (5.5m Length) LVT",
-            "40x10 Cu Busbar (5.5m Length) LVT",
-            "50x10 Cu Busbar (5.5m Length) LVT",
-            "63x10 Cu Busbar (5.5m Length) LVT",
-            "75x10 Cu Busbar (5.5m Length) LVT",
-            "80x10 Cu Busbar (5.5m Length) LVT",
-            "100x10 Cu Busbar (5.5m Length) LVT"
-        ]
-        size_var = tk.StringVar(value=busbar_sizes[0])
-        ttk.Combobox(form, textvariable=size_var, values=busbar_sizes, state="readonly").grid(row=0, column=1, padx=5, pady=5)
+        size_var = tk.StringVar(value=BUSBAR_TERMINAL_SIZES[0])
+        ttk.Combobox(form, textvariable=size_var, values=BUSBAR_TERMINAL_SIZES, state="readonly").grid(row=0, column=1, padx=5, pady=5)
 
         tk.Label(form, text="No. of Runs:").grid(row=1, column=0, padx=5, pady=5)
         runs_var = tk.StringVar(value="1")
@@ -655,18 +3235,12 @@ class PanelDesigner:
 
     def spawn_busbar_terminal(self, busbar_size, no_of_runs, phase, busbar_type):
         if busbar_type.lower() == "horizontal":
-            x1, x2 = 50, 250
-            y = 150
-            line_id = self.canvas.create_line(x1, y, x2, y, fill=self.palette["busbar_terminal"], width=4)
-            coords = [x1, y, x2, y]
+            coords = [50, 150, 250, 150]
         else:
-            x = 200
-            y1, y2 = 50, 300
-            line_id = self.canvas.create_line(x, y1, x, y2, fill=self.palette["busbar_terminal"], width=4)
-            coords = [x, y1, x, y2]
+            coords = [200, 50, 200, 300]
 
-        busbar_data = {
-            "id": line_id,
+        self.add_busbar({
+            "id": None,
             "type": busbar_type.lower(),
             "coords": coords,
             "amperage": None,
@@ -674,11 +3248,7 @@ class PanelDesigner:
             "phase": phase,
             "busbar_size": busbar_size,
             "no_of_runs": int(no_of_runs)
-        }
-        self.busbars.append(busbar_data)
-        self.undo_stack.append({"type": "add_busbar", "busbar": busbar_data})
-        self.make_busbar_draggable(line_id, busbar_type.lower())
-        self.make_busbar_resizable(line_id, busbar_type.lower())
+        })
 
     def add_vertical_busbar_form(self):
         form = tk.Toplevel(self.root)
@@ -707,20 +3277,14 @@ class PanelDesigner:
     def spawn_vertical_busbar(self, amperage, current_density, phase):
         x = 150
         y1, y2 = 50, 300
-        line_id = self.canvas.create_line(x, y1, x, y2, fill=self.palette["busbar"], width=4)
-        self.canvas.tag_raise(line_id)
-        busbar_data = {
-            "id": line_id,
+        self.add_busbar({
+            "id": None,
             "type": "vertical",
             "coords": [x, y1, x, y2],
             "amperage": amperage,
             "current_density": current_density,
             "phase": phase
-        }
-        self.busbars.append(busbar_data)
-        self.undo_stack.append({"type": "add_busbar", "busbar": busbar_data})
-        self.make_busbar_draggable(line_id, "vertical")
-        self.make_busbar_resizable(line_id, "vertical")
+        })
 
     def add_horizontal_busbar_form(self):
         form = tk.Toplevel(self.root)
@@ -749,129 +3313,65 @@ class PanelDesigner:
     def spawn_horizontal_busbar(self, amperage, current_density, phase):
         x1, x2 = 50, 250
         y = 100
-        line_id = self.canvas.create_line(x1, y, x2, y, fill=self.palette["busbar"], width=4)
-        self.canvas.tag_raise(line_id)
-        busbar_data = {
-            "id": line_id,
+        self.add_busbar({
+            "id": None,
             "type": "horizontal",
             "coords": [x1, y, x2, y],
             "amperage": amperage,
             "current_density": current_density,
             "phase": phase
-        }
-        self.busbars.append(busbar_data)
-        self.undo_stack.append({"type": "add_busbar", "busbar": busbar_data})
-        self.make_busbar_draggable(line_id, "horizontal")
-        self.make_busbar_resizable(line_id, "horizontal")
-
-    def make_busbar_draggable(self, line_id, busbar_type):
-        def on_press(event):
-            self.drag_data["item"] = line_id
-            self.drag_data["x"] = event.x
-            self.drag_data["y"] = event.y
-
-        def on_release(event):
-            self.drag_data["item"] = None
-
-        def on_move(event):
-            if self.drag_data["item"] == line_id:
-                dx = event.x - self.drag_data["x"]
-                dy = event.y - self.drag_data["y"]
-                self.drag_data["x"] = event.x
-                self.drag_data["y"] = event.y
-                coords = self.canvas.coords(line_id)
-                new_coords = [coords[0] + dx, coords[1] + dy, coords[2] + dx, coords[3] + dy]
-                self.canvas.coords(line_id, *new_coords)
-                for b in self.busbars:
-                    if b["id"] == line_id:
-                        b["coords"] = new_coords
-                        break
-
-        self.canvas.tag_bind(line_id, "<ButtonPress-1>", on_press)
-        self.canvas.tag_bind(line_id, "<ButtonRelease-1>", on_release)
-        self.canvas.tag_bind(line_id, "<B1-Motion>", on_move)
-
-    def make_busbar_resizable(self, line_id, busbar_type):
-        handle_size = 6
-        coords = self.canvas.coords(line_id)
-        handle_id = self.canvas.create_rectangle(coords[2] - handle_size, coords[3] - handle_size,
-                                                 coords[2] + handle_size, coords[3] + handle_size, fill=self.palette["handle"], tags=("handle",))
-
-        def on_press(event):
-            self.drag_data["item"] = handle_id
-            self.drag_data["x"] = event.x
-            self.drag_data["y"] = event.y
-
-        def on_release(event):
-            self.drag_data["item"] = None
-
-        def on_move(event):
-            if self.drag_data["item"] == handle_id:
-                dy = event.y - self.drag_data["y"]
-                dx = event.x - self.drag_data["x"]
-                self.drag_data["x"] = event.x
-                self.drag_data["y"] = event.y
-                coords = self.canvas.coords(line_id)
-                if busbar_type == "vertical":
-                    coords[3] += dy
-                else:
-                    coords[2] += dx
-                self.canvas.coords(line_id, *coords)
-                self.canvas.coords(handle_id, coords[2] - handle_size, coords[3] - handle_size,
-                                   coords[2] + handle_size, coords[3] + handle_size)
-                for b in self.busbars:
-                    if b["id"] == line_id:
-                        b["coords"] = coords
-                        break
-
-        self.canvas.tag_bind(handle_id, "<ButtonPress-1>", on_press)
-        self.canvas.tag_bind(handle_id, "<ButtonRelease-1>", on_release)
-        self.canvas.tag_bind(handle_id, "<B1-Motion>", on_move)
+        })
+
+    def place_busbar(self, busbar, coords):
+        """Move a busbar's line and resize handle on the canvas to coords."""
+        if busbar.get("id") is None:
+            return
+        coords = self.to_canvas(coords)
+        self.canvas.coords(busbar["id"], *coords)
+        handle_id = self.busbar_handles.get(busbar["id"])
+        if handle_id is not None:
+            handle_size = self.BUSBAR_HANDLE_SIZE
+            self.canvas.coords(handle_id, coords[2] - handle_size, coords[3] - handle_size,
+                               coords[2] + handle_size, coords[3] + handle_size)
 
     def load_panel(self, name):
+        self.cancel_render()
         self.panel_name = name
-        self.canvas.delete("all")
+        self.clear_canvas()
         self.cubicles.clear()
         self.busbars.clear()
 
-        with open(f"{PANELS_FOLDER}/{name}.json", "r") as f:
-            panel_data = json.load(f)
+        panel_data = read_panel_file(os.path.join(PANELS_FOLDER, panel_filename(name)))
 
         self.panel_depth = panel_data.get("panel_depth")
 
+        # Build the model first; canvas items are created by render_model
         for cub in panel_data.get("cubicles", []):
-            rect = self.canvas.create_rectangle(*cub["coords"], fill=self.palette["cubicle_fill"], outline=self.palette["cubicle_outline"], width=3)
             cubicle_data = {
-                "id": rect,
+                "id": None,
                 "width": cub["width"],
                 "height": cub["height"],
                 "x": cub["coords"][0],
                 "y": cub["coords"][1],
+                "coords": list(cub["coords"]),
                 "compartments": []
             }
-            self.cubicles.append(cubicle_data)
-            self.undo_stack.append({"type": "add_cubicle", "cubicle": cubicle_data})
-
-            self.create_compartments(cubicle_data, len(cub["compartments"]))
+            self.build_compartments(cubicle_data, len(cub["compartments"]))
 
             for comp_idx, saved_comp in enumerate(cub["compartments"]):
                 for sec_idx, saved_sec in enumerate(saved_comp["sections"]):
                     item = saved_sec.get("item")
                     if item:
                         section = cubicle_data["compartments"][comp_idx]["sections"][sec_idx]
-                        self.canvas.itemconfig(section["id"], fill=self.palette["section_selected"])
                         section["item"] = {"model": item["model"], "desc": item.get("desc", ""), "text_ids": []}
-                        self.draw_vertical_text_in_section(section, item["model"], item.get("desc", ""))
+
+            self.cubicles.append(cubicle_data)
 
         for busbar in panel_data.get("busbars", []):
-            line = self.canvas.create_line(*busbar["coords"], fill="orange", width=3)
-            self.canvas.tag_raise(line)
-            busbar["id"] = line
+            busbar["id"] = None
             self.busbars.append(busbar)
-            self.make_busbar_draggable(line, busbar["type"])
-            self.make_busbar_resizable(line, busbar["type"])
+        self.clear_history()
 
-        self.apply_theme()
         self.add_bottom_right_info()
 
         if self.panel_depth:
@@ -880,6 +3380,8 @@ class PanelDesigner:
             except Exception:
                 pass
 
+        self.render_model()
+
     def save_panel(self):
         if not self.panel_name:
             messagebox.showwarning("No Panel", "Please create or select a panel first.")
@@ -894,10 +3396,10 @@ class PanelDesigner:
 
         for cub in self.cubicles:
             cub_data = {
-                "coords": self.canvas.coords(cub["id"]),
+                "coords": list(cub["coords"]),
                 "width": cub["width"],
                 "height": cub["height"],
-                "color": self.canvas.itemcget(cub["id"], "fill"),
+                "color": self.palette["cubicle_fill"],
                 "compartments": []
             }
             for comp in cub["compartments"]:
@@ -912,354 +3414,173 @@ class PanelDesigner:
                 cub_data["compartments"].append(comp_data)
             panel_data["cubicles"].append(cub_data)
 
-        with open(f"{PANELS_FOLDER}/{self.panel_name}.json", "w") as f:
-            json.dump(panel_data, f)
+        panel_path = os.path.join(PANELS_FOLDER, self.panel_name + PANEL_EXT)
+        try:
+            header = write_panel_file(panel_path, panel_data)
+            retire_legacy_panel(self.panel_name)
+        except Exception as e:
+            messagebox.showerror("Save Failed", f"Could not save panel '{self.panel_name}':\n{e}")
+            return
+        update_panel_index(panel_path, header)
 
         messagebox.showinfo("Saved", f"Panel '{self.panel_name}' saved successfully!")
         self.refresh_panel_menu()
 
     def load_breaker_excel(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx")])
+        file_path = filedialog.askopenfilename(filetypes=[("Price lists", "*.xlsx *.csv"), ("Excel files", "*.xlsx"),
+                                                          ("CSV files", "*.csv")])
         if not file_path:
             return
-        try:
-            df = pd.read_excel(file_path)
-            if "Model No" not in df.columns or "Description" not in df.columns:
-                messagebox.showerror("Error", "Excel must have 'Model No' and 'Description' columns.")
-                return
-            added = 0
-            for _, row in df.iterrows():
-                model = str(row["Model No"]).strip()
-                desc = str(row["Description"]).strip()
-                if model and model not in self.breaker_types:
-                    self.breaker_types[model] = desc
-                    added += 1
-            if added > 0:
-                self.save_breaker_types()
-            messagebox.showinfo("Loaded", f"Added {added} new breaker types.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load Excel: {e}")
+        update_existing = messagebox.askyesno("Upload Breaker Types",
+                                              "Also update the descriptions of models that already exist?")
+
+        def work(report, cancel):
+            frame = read_catalogue_file(file_path, progress=report, cancel=cancel)
+            return None if frame is None else self.catalogue.stage_import(frame, update_existing)
+
+        run_with_progress(self.root, "Importing Breaker Types", f"Reading {os.path.basename(file_path)}...", work,
+                          self.apply_breaker_import,
+                          lambda e: messagebox.showerror("Error", f"Failed to load file: {e}"))
+
+    def apply_breaker_import(self, staged):
+        added, updated = self.catalogue.commit_import(staged)
+        msg = f"Added {added} new breaker types."
+        if updated:
+            msg += f"\nUpdated {updated} descriptions."
+        messagebox.showinfo("Loaded", msg)
 
     def generate_bom(self):
         if not self.cubicles:
             messagebox.showwarning("Generate BOM", "Please add cubicles and components first.")
             return
+        if self._bom_job is not None:
+            messagebox.showinfo("Generate BOM", "A BOM is already being generated.")
+            return
 
-        # Google Sheets sync
-        creds = get_credentials()
-        client = gspread.authorize(creds)
-        spreadsheet = None
-
-        spreadsheet_name = f"{self.customer}_{self.project}_{self.ref}"
-        try:
-            spreadsheet = client.open(spreadsheet_name)
-        except gspread.SpreadsheetNotFound:
-            spreadsheet = client.create(spreadsheet_name)
-
+        # Everything the job needs is taken from the model here, on the Tk thread
+        customer, project, ref = self.customer, self.project, self.ref
+        key = project_key(customer, project, ref)
+        spreadsheet_name = f"{customer}_{project}_{ref}"
         sheet_title = self.panel_name
-        try:
-            ws = spreadsheet.worksheet(sheet_title)
-        except gspread.WorksheetNotFound:
-            ws = spreadsheet.add_worksheet(title=sheet_title, rows="200", cols="20")
-
-        data = [["Cubicle (X,Y)"] + SECTION_NAMES]
-        for cub_idx, cub in enumerate(self.cubicles, start=1):
-            for comp_idx, comp in enumerate(cub["compartments"], start=1):
-                row = [f"{cub_idx},{comp_idx}"]
-                for section_name in SECTION_NAMES:
-                    item = next((sec["item"] for sec in comp["sections"] if sec["name"] == section_name and sec["item"]), None)
-                    row.append(item["model"] if item else "")
-                data.append(row)
-
-        data.append([])
-        data.append(["Busbars"])
-        data.append(["Type", "Amperage (A)", "Current Density (A/mm²)", "Coordinates (x1, y1, x2, y2)", "Phase", "Busbar Size", "No. of Runs", "Busbar Length (mm)"])
-        for bus in self.busbars:
-            coords = tuple(map(int, bus["coords"]))
-            length = (coords[2] - coords[0]) if bus["type"] == "horizontal" else (coords[3] - coords[1])
-            data.append([bus.get("type"), bus.get("amperage"), bus.get("current_density"), str(coords), bus.get("phase"), bus.get("busbar_size", ""), bus.get("no_of_runs", ""), length])
-
-        ws.update(values=data, range_name="A1")
-
-        # Totals across project
-        part_totals = defaultdict(lambda: {"desc": "", "total": 0, "panels": defaultdict(int)})
-        category_totals = defaultdict(lambda: defaultdict(lambda: {"desc": "", "total": 0, "panels": defaultdict(int)}))
-        busbar_totals = defaultdict(lambda: {"total": 0, "panels": defaultdict(int), "desc": ""})
-
-        panel_files = [f for f in os.listdir(PANELS_FOLDER) if f.endswith(".json")]
-        relevant_panels = []
-        no_match_counter = 0
-
-        for fname in panel_files:
-            fpath = os.path.join(PANELS_FOLDER, fname)
-            with open(fpath, "r") as f:
-                panel_data = json.load(f)
-                info = panel_data.get("project_info", {})
-                if info.get("customer") == self.customer and info.get("project") == self.project and info.get("ref") == self.ref:
-                    pname = fname[:-5]
-                    relevant_panels.append(pname)
-
-                    for cub in panel_data.get("cubicles", []):
-                        for comp in cub.get("compartments", []):
-                            for sec in comp.get("sections", []):
-                                item = sec.get("item")
-                                if item:
-                                    model = item["model"]
-                                    desc = item.get("desc", "")
-                                    category = sec.get("name", "Others")
-                                    part_totals[model]["desc"] = desc
-                                    part_totals[model]["total"] += 1
-                                    part_totals[model]["panels"][pname] += 1
-
-                                    cat_bucket = category_totals[category][model]
-                                    cat_bucket["desc"] = desc
-                                    cat_bucket["total"] += 1
-                                    cat_bucket["panels"][pname] += 1
-
-                    for busbar in panel_data.get("busbars", []):
-                        amp = busbar.get("amperage")
-                        cd = busbar.get("current_density")
-                        coords = busbar.get("coords", [0, 0, 0, 0])
-                        phase = busbar.get("phase", "Single Phase")
-                        busbar_size_str = busbar.get("busbar_size", "")
-                        try:
-                            no_of_runs = int(busbar.get("no_of_runs", 1))
-                        except Exception:
-                            no_of_runs = 1
-
-                        length = (coords[2] - coords[0]) if busbar.get("type") == "horizontal" else (coords[3] - coords[1])
-                        extra_qty = 0
-                        if self.panel_depth and self.panel_depth > 400:
-                            extra_qty = (self.panel_depth - 400) * no_of_runs
-
-                        if busbar_size_str:
-                            # lookup in busbar_data from CSV
-                            match = self.busbar_data[self.busbar_data["Item description"].str.contains(busbar_size_str, case=False, na=False, regex=False)]
-                            if not match.empty:
-                                bus_part_no = str(match.iloc[0]["Part no"])
-                                bus_desc = str(match.iloc[0]["Item description"])
-                            else:
-                                bus_part_no = busbar_size_str  # fallback
-                                bus_desc = busbar_size_str
-
-                            if phase.lower().startswith("single"):
-                                phase_multiplier = 2
-                            else:
-                                phase_multiplier = 4
-
-                            qty = (max(0, int(length)) + (self.panel_depth - 400)) * no_of_runs * phase_multiplier
-                            busbar_totals[bus_part_no]["desc"] = bus_desc
-                            busbar_totals[bus_part_no]["total"] += qty
-                            busbar_totals[bus_part_no]["panels"][pname] += qty
-
-                        elif cd is not None and amp is not None and cd > 0 and amp > 0:
-                            area_needed = amp / cd
-                            nearest_busbar = self.find_nearest_highest_busbar(area_needed)
-
-                            if nearest_busbar is None:
-                                bus_part_no = f"NO_MATCH_{no_match_counter}"
-                                bus_desc = f"No match for Phase={phase}, Amperage={amp}, CD={cd}, AreaNeeded={area_needed:.2f}"
-                                qty = 0
-                                no_match_counter += 1
-                            else:
-                                bus_part_no = nearest_busbar["Part no"]
-                                bus_desc = nearest_busbar["Item description"]
-                                bus_runs = int(nearest_busbar["No. of runs"]) if "No. of runs" in nearest_busbar else 1
-                                base_qty = max(0, int(length)) * bus_runs
-                                multiplier = 2 if phase == "Single Phase" else 4
-                                qty = base_qty * multiplier
-                                qty += extra_qty
-                            
-                            busbar_totals[bus_part_no]["desc"] = bus_desc
-                            busbar_totals[bus_part_no]["total"] += qty
-                            busbar_totals[bus_part_no]["panels"][pname] += qty
-
-        # Total BOM sheet
-        try:
-            total_ws = spreadsheet.worksheet("Total BOM")
-        except gspread.WorksheetNotFound:
-            total_ws = spreadsheet.add_worksheet(title="Total BOM", rows="200", cols="30")
-
-        header = ["Part No.", "Description", "Total Qty"] + relevant_panels
-        total_data = [header]
-
-        for model, info in part_totals.items():
-            row = [model, info["desc"], info["total"]]
-            for pname in relevant_panels:
-                row.append(info["panels"].get(pname, 0))
-            total_data.append(row)
-
-        total_data.append([])
-        total_data.append(["Busbar Materials"])
-        total_data.append(header)
-        for model, info in busbar_totals.items():
-            row = [model, info["desc"], info["total"]]
-            for pname in relevant_panels:
-                row.append(info["panels"].get(pname, 0))
-            total_data.append(row)
-
-        serializable_data = []
-        for row in total_data:
-            new_row = []
-            for item in row:
-                if isinstance(item, np.generic):
-                    new_row.append(item.item())
-                else:
-                    new_row.append(item)
-            serializable_data.append(new_row)
-
-        total_ws.clear()
-        total_ws.update(values=serializable_data, range_name="A1")
-        header_format = {"backgroundColor": {"red": 0.8, "green": 0.8, "blue": 0.8}, "horizontalAlignment": "CENTER", "textFormat": {"bold": True}}
-        total_ws.format("A1:Z1", header_format)
-
-        # Grouped PDF
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-
-        desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
-        project_folder = os.path.join(desktop_path, self.project)
-        os.makedirs(project_folder, exist_ok=True)
+        panel_rows = panel_sheet_rows(self.cubicles, self.busbars)
+        panel_depth = self.panel_depth
+        catalogue = self.busbar_catalogue
+        project_folder = os.path.join(os.path.expanduser("~"), "Desktop", project)
+
+        def work(report, cancel):
+            # Totals across project, merged from cached per-panel contributions
+            bom = build_project_bom(customer, project, ref, catalogue, panel_depth)
+            if cancel.is_set():
+                return None
+            report(1 / 3, "Uploading to Google Sheets and building PDF...")
+
+            def build_pdf():
+                os.makedirs(project_folder, exist_ok=True)
+                return write_bom_pdf(os.path.join(project_folder, "Total_BOM.pdf"), bom)
+
+            # The Sheets upload and the PDF don't depend on each other
+            results = {}
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                stages = {pool.submit(upload_bom_to_sheets, key, spreadsheet_name, sheet_title, panel_rows, bom): "sheets",
+                          pool.submit(build_pdf): "pdf"}
+                for future in as_completed(stages):
+                    try:
+                        results[stages[future]] = (future.result(), None)
+                    except Exception as e:
+                        results[stages[future]] = (None, e)
+                    report((1 + len(results)) / 3)
+            return results
 
-        pdf_path = os.path.join(project_folder, "Total_BOM.pdf")
-        doc = SimpleDocTemplate(pdf_path, pagesize=A4, rightMargin=24, leftMargin=24, topMargin=24, bottomMargin=24)
+        def on_close():
+            self._bom_job = None
 
-        styles = getSampleStyleSheet()
-        elements = []
+        self._bom_job = run_with_progress(
+            self.root, "Generating BOM", "Totalling project BOM...", work, self.finish_bom,
+            lambda e: messagebox.showerror("Generate BOM", f"BOM generation failed: {e}"), on_close)
 
-        header_table_data = []
-        logo_path = resource_path("VLPP.ico")
-        if os.path.exists(logo_path):
-            header_logo = RLImage(logo_path, width=40, height=40)
-        else:
-            header_logo = Paragraph("", styles["Normal"])
-
-        header_email = Paragraph("<b>venora@gmail.com</b>", styles["Normal"])
-        header_table_data.append([header_logo, header_email])
-
-        header_table = Table(header_table_data, colWidths=[60, 440])
-        header_table.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "MIDDLE"), ("ALIGN", (1, 0), (1, 0), "RIGHT")]))
-        elements.append(header_table)
-        elements.append(Spacer(1, 8))
-
-        project_style = ParagraphStyle("ProjectInfo", parent=styles["Normal"], fontSize=10, leading=13, spaceAfter=6)
-        project_info_text = (f"<b>Customer:</b> {self.customer}<br/>"
-                             f"<b>Project:</b> {self.project}<br/>"
-                             f"<b>Reference:</b> {self.ref}")
-        project_info_para = Paragraph(project_info_text, project_style)
-        elements.append(project_info_para)
-        elements.append(Spacer(1, 8))
-
-        title = Paragraph("<b>Total Bill of Materials (BOM)</b>", styles["Title"])
-        elements.append(title)
-        elements.append(Spacer(1, 12))
+    def finish_bom(self, results):
+        pdf_path, pdf_error = results["pdf"]
+        _, sheets_error = results["sheets"]
 
-        def build_table(rows):
-            table = Table(rows, repeatRows=1)
-            table_style = TableStyle([
-                ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 6),
-                ("GRID", (0, 0), (-1, -1), 0.25, colors.black),
-            ])
-            table.setStyle(table_style)
-            for i in range(1, len(rows)):
-                if i % 2 == 0:
-                    table.setStyle(TableStyle([("BACKGROUND", (0, i), (-1, i), colors.whitesmoke)]))
+        if pdf_error is None:
+            try:
+                if os.name == "nt":
+                    os.startfile(pdf_path)
+                elif sys.platform == "darwin":
+                    subprocess.Popen(["open", pdf_path])
                 else:
-                    table.setStyle(TableStyle([("BACKGROUND", (0, i), (-1, i), colors.beige)]))
-            return table
+                    subprocess.Popen(["xdg-open", pdf_path])
+            except Exception as e:
+                print("Could not open PDF automatically:", e)
+            messagebox.showinfo("PDF Saved", f"Total BOM PDF saved to:\n{pdf_path}")
+        else:
+            messagebox.showerror("PDF Failed", f"Could not build the BOM PDF: {pdf_error}")
 
-        ordered_categories = ["Breaker", "ELR/EFR", "PFR", "Power Analyzer/Energy Meter", "Indicator Light", "SPD"]
-        for cat in ordered_categories:
-            items = category_totals.get(cat, {})
-            if not items:
-                continue
-            elements.append(Paragraph(f"<b>{cat}</b>", styles["Heading2"]))
-            header_row = ["Part No.", "Description", "Total Qty"] + relevant_panels
-            rows = [header_row]
-            for model, info in items.items():
-                row = [model, info["desc"], int(info["total"])]
-                for pname in relevant_panels:
-                    row.append(int(info["panels"].get(pname, 0)))
-                rows.append(row)
-            elements.append(build_table(rows))
-            elements.append(Spacer(1, 12))
-
-        if busbar_totals:
-            elements.append(Paragraph("<b>Busbar Materials</b>", styles["Heading2"]))
-            header_row = ["Part No.", "Description", "Total Qty"] + relevant_panels
-            rows = [header_row]
-            for model, info in busbar_totals.items():
-                row = [model, info["desc"], int(info["total"])]
-                for pname in relevant_panels:
-                    row.append(int(info["panels"].get(pname, 0)))
-                rows.append(row)
-            elements.append(build_table(rows))
-
-        doc.build(elements)
+        if sheets_error is not None:
+            messagebox.showerror("Google Sheets", f"Could not update Google Sheets: {sheets_error}")
+        elif pdf_error is None:
+            messagebox.showinfo("BOM Generated", "BOM added to Google Sheets and grouped PDF created!")
 
-        try:
-            if os.name == "nt":
-                os.startfile(pdf_path)
-            elif sys.platform == "darwin":
-                subprocess.Popen(["open", pdf_path])
-            else:
-                subprocess.Popen(["xdg-open", pdf_path])
-        except Exception as e:
-            print("Could not open PDF automatically:", e)
+    # ---------- UNDO / REDO ----------
+    def push_command(self, command):
+        self.history.push(command)
+        self.update_history_buttons()
 
-        messagebox.showinfo("PDF Saved", f"Total BOM PDF saved to:\n{pdf_path}")
-        total_ws.format("A1:Z1", header_format)
-        messagebox.showinfo("BOM Generated", "BOM added to Google Sheets and grouped PDF created!")
+    def clear_history(self):
+        self.history.clear()
+        self.update_history_buttons()
 
-    def find_nearest_highest_busbar(self, area_value):
-        if self.busbar_data.empty:
-            return None
-        try:
-            filtered = self.busbar_data[self.busbar_data['Area (sqmm)'] >= area_value]
-        except Exception:
-            return None
-        if filtered.empty:
-            return None
-        match_row = filtered.loc[filtered['Area (sqmm)'].idxmin()]
-        return match_row
+    def update_history_buttons(self):
+        self.undo_button.configure(state=tk.NORMAL if self.history.done else tk.DISABLED)
+        self.redo_button.configure(state=tk.NORMAL if self.history.undone else tk.DISABLED)
 
     def undo_last_action(self):
-        if not self.undo_stack:
-            messagebox.showinfo("Undo", "Nothing to undo.")
+        self.step_history(self.history.undo, undo=True)
+
+    def redo_last_action(self):
+        self.step_history(self.history.redo, undo=False)
+
+    def step_history(self, pop, undo):
+        if self.drag_data["item"] is not None:  # drop a drag in progress back where it started
+            busbar = self.drag_data["item"][1]
+            self.end_drag()
+            self.place_busbar(busbar, busbar["coords"])
+        command = pop()
+        if command is None:
+            self.root.bell()
             return
-
-        action = self.undo_stack.pop()
-        if action["type"] == "add_cubicle":
-            self.canvas.delete(action["cubicle"]["id"])
-            for comp in action["cubicle"]["compartments"]:
-                for sec in comp["sections"]:
-                    self.canvas.delete(sec["id"])
-            self.cubicles.remove(action["cubicle"])
-        elif action["type"] == "add_busbar":
-            self.canvas.delete(action["busbar"]["id"])
-            self.busbars.remove(action["busbar"])
-        elif action["type"] == "select_component":
-            section = action["section"]
-            # remove current text ids
-            try:
-                for tid in action.get("new_text_ids", []):
-                    self.canvas.delete(tid)
-            except Exception:
-                pass
-            section["item"] = action["previous_item"]
-            # recolor
-            self.canvas.itemconfig(action["rect_id"], fill=self.palette["section_empty"] if not action["previous_item"] else self.palette["section_selected"])
-            # if previous item existed, redraw its text
-            if action["previous_item"]:
-                section["item"] = {"model": action["previous_item"]["model"], "desc": action["previous_item"].get("desc", ""), "text_ids": []}
-                tids = self.draw_vertical_text_in_section(section, action["previous_item"]["model"], action["previous_item"].get("desc", ""))
-                section["item"]["text_ids"] = tids
-        messagebox.showinfo("Undo", "Last action undone.")
+        self.apply_command(command, undo)
+        self.update_history_buttons()
+
+    def apply_command(self, command, undo):
+        """Apply (or with undo=True revert) one history command."""
+        kind = command["type"]
+        if kind in ("add_cubicle", "delete_cubicle"):
+            if undo == (kind == "add_cubicle"):
+                self.undraw_cubicle(command["cubicle"])
+                remove_at(self.cubicles, command["cubicle"], command["index"])
+            else:
+                self.cubicles.insert(command["index"], command["cubicle"])
+                self.draw_cubicle(command["cubicle"])
+                self.raise_overlays()
+            self.update_scroll_region()
+        elif kind == "add_busbar":
+            busbar = command["busbar"]
+            if undo:
+                self.delete_items([busbar.get("id")])
+                busbar["id"] = None
+                remove_at(self.busbars, busbar, command["index"])
+            else:
+                self.busbars.insert(command["index"], busbar)
+                self.draw_busbar(busbar)
+            self.update_scroll_region()
+        elif kind in ("move_busbar", "resize_busbar"):
+            coords = list(command["before"] if undo else command["after"])
+            command["busbar"]["coords"] = coords
+            self.place_busbar(command["busbar"], coords)
+            self.update_scroll_region()
+        elif kind == "select_component":
+            self.set_section_item(command["section"], command["before"] if undo else command["after"])
 
     # ================= THEME HELPERS =================
     def get_palette(self, mode="light"):
@@ -1308,40 +3629,16 @@ class PanelDesigner:
         except Exception:
             pass
 
-        for cub in self.cubicles:
-            try:
-                self.canvas.itemconfig(cub["id"], fill=self.palette["cubicle_fill"], outline=self.palette["cubicle_outline"])
-            except Exception:
-                pass
-            for comp in cub["compartments"]:
-                for sec in comp["sections"]:
-                    try:
-                        fill = self.palette["section_selected"] if sec.get("item") else self.palette["section_empty"]
-                        self.canvas.itemconfig(sec["id"], fill=fill, outline=self.palette["section_outline"])
-                        # recolor text if exists
-                        if sec.get("item") and sec["item"].get("text_ids"):
-                            for tid in sec["item"]["text_ids"]:
-                                self.canvas.itemconfig(tid, fill=self.palette["text"])
-                    except Exception:
-                        pass
-
-        for b in self.busbars:
-            try:
-                color = self.palette["busbar_terminal"] if b.get("busbar_size") else self.palette["busbar"]
-                self.canvas.itemconfig(b["id"], fill=color)
-            except Exception:
-                pass
-
-        try:
-            for h in self.canvas.find_withtag("handle"):
-                self.canvas.itemconfig(h, fill=self.palette["handle"])
-        except Exception:
-            pass
-
-        try:
-            self.add_bottom_right_info()
-        except Exception:
-            pass
+        # every themed canvas item carries a role tag, so this is independent of the design size
+        p = self.palette
+        self.canvas.itemconfig("cubicle", fill=p["cubicle_fill"], outline=p["cubicle_outline"])
+        self.canvas.itemconfig("section-empty", fill=p["section_empty"], outline=p["section_outline"])
+        self.canvas.itemconfig("section-filled", fill=p["section_selected"], outline=p["section_outline"])
+        self.canvas.itemconfig("label", fill=p["text"])
+        self.canvas.itemconfig("busbar", fill=p["busbar"])
+        self.canvas.itemconfig("terminal", fill=p["busbar_terminal"])
+        self.canvas.itemconfig("handle", fill=p["handle"])
+        self.canvas.itemconfig("footer-text", fill=p["muted_text"])
 
         # sync toggle label to current mode
         try:
@@ -1374,64 +3671,137 @@ class PanelDesigner:
             self.set_light_mode()
 
 
-def get_credentials():
-    creds = None
-    try:
-        if os.path.exists(TOKEN_FILE):
-            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+# The session's refresh timer and the BOM worker can both refresh and save
+# the token; _token_lock keeps one refresh-and-save at a time.
+_token_lock = threading.RLock()
 
-        if creds and creds.valid:
-            return creds
 
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(Request())
-                with open(TOKEN_FILE, "w") as token:
-                    token.write(creds.to_json())
-                return creds
-            except Exception as e:
-                print("Refresh failed, regenerating token.json:", e)
-                try:
-                    os.remove(TOKEN_FILE)
-                except Exception:
-                    pass
+def _save_token(creds):
+    with _token_lock:
+        atomic_write(TOKEN_FILE, lambda f: f.write(creds.to_json()))
+
 
-        flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open(TOKEN_FILE, "w") as token:
-            token.write(creds.to_json())
+def get_credentials():
+    """Stored credentials, refreshed if needed; the browser sign-in only runs when there is no usable refresh token."""
+    creds = None
+    if os.path.exists(TOKEN_FILE):
+        try:
+            creds = google_credentials.Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+        except Exception as e:
+            print("Unreadable token.json, signing in again:", e)
+
+    if creds and creds.valid:
         return creds
 
-    except Exception as e:
-        print("Credential error, regenerating:", e)
+    if creds and creds.expired and creds.refresh_token:
         try:
-            if os.path.exists(TOKEN_FILE):
+            with _token_lock:
+                creds.refresh(google_auth_requests.Request())
+                _save_token(creds)
+            return creds
+        except google_auth_exceptions.RefreshError as e:
+            # the grant was revoked or expired; network errors propagate instead of forcing a sign-in
+            print("Refresh failed, regenerating token.json:", e)
+            try:
                 os.remove(TOKEN_FILE)
-        except Exception:
-            pass
-        flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open(TOKEN_FILE, "w") as token:
-            token.write(creds.to_json())
-        return creds
+            except Exception:
+                pass
+
+    flow = oauth_flow.InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
+    creds = flow.run_local_server(port=0)
+    _save_token(creds)
+    return creds
+
+
+# ====== Sheets Client ======
+# One authorised gspread client per app session. It shares a keep-alive
+# AuthorizedSession whose adapter retries 429/5xx responses to idempotent
+# requests with exponential backoff (honouring Retry-After). A POST such as
+# batch_update is only retried when it could not connect: a lost response
+# may belong to a request the server already applied. The access token is
+# refreshed on a timer shortly before it expires, so an export never waits
+# on a token round trip.
+SHEETS_RETRY = dict(total=5, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504),
+                    respect_retry_after_header=True, raise_on_status=False)
+TOKEN_REFRESH_MARGIN = 300  # seconds before expiry
+_sheets_client = None
+_sheets_client_lock = threading.Lock()
+
+
+class SheetsClient:
+    def __init__(self):
+        self.creds = get_credentials()
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.session = google_auth_requests.AuthorizedSession(self.creds)
+        adapter = HTTPAdapter(max_retries=Retry(**SHEETS_RETRY))
+        self.session.mount("https://", adapter)
+        self.client = gspread.Client(auth=self.creds, session=self.session)
+        self._timer = None
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if self.creds.expiry is None:
+            return
+        # google-auth keeps expiry as a naive UTC datetime
+        expiry = self.creds.expiry.replace(tzinfo=datetime.timezone.utc)
+        remaining = (expiry - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        self._timer = threading.Timer(max(30, remaining - TOKEN_REFRESH_MARGIN), self._refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh(self):
+        try:
+            with _token_lock:
+                self.creds.refresh(google_auth_requests.Request())
+                _save_token(self.creds)
+        except google_auth_exceptions.RefreshError as e:
+            # leave it to the next export: get_sheets_client starts over with a sign-in
+            print("Background token refresh failed:", e)
+            return
+        except Exception as e:
+            print("Background token refresh failed, will retry:", e)
+        self._schedule_refresh()
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self.session.close()
+
+
+def get_sheets_client():
+    global _sheets_client
+    with _sheets_client_lock:
+        if _sheets_client is None:
+            _sheets_client = SheetsClient()
+        return _sheets_client.client
+
+
+def reset_sheets_client():
+    """Drop the session client, e.g. after its refresh token stopped working."""
+    global _sheets_client
+    with _sheets_client_lock:
+        if _sheets_client is not None:
+            _sheets_client.close()
+            _sheets_client = None
+# ====== End Sheets Client ======
 
 
 def load_all_projects():
     projects = {}
-    os.makedirs(PANELS_FOLDER, exist_ok=True)
-    for file in os.listdir(PANELS_FOLDER):
-        if file.endswith(".json"):
-            try:
-                with open(f"{PANELS_FOLDER}/{file}", "r") as f:
-                    data = json.load(f)
-                    pinfo = data.get("project_info", {})
-                    c, p, r = pinfo.get("customer", "").strip(), pinfo.get("project", "").strip(), pinfo.get("ref", "").strip()
-                    if c and p and r:
-                        key = (c, p, r)
-                        display_name = f"{c} | {p} | {r}"
-                        projects[key] = display_name
-            except Exception:
-                continue
+    for entry in load_panel_index().values():
+        pinfo = entry.get("project_info")
+        if not pinfo:
+            continue
+        try:
+            c, p, r = pinfo.get("customer", "").strip(), pinfo.get("project", "").strip(), pinfo.get("ref", "").strip()
+        except Exception:
+            continue
+        if c and p and r:
+            key = (c, p, r)
+            display_name = f"{c} | {p} | {r}"
+            projects[key] = display_name
     return sorted(projects.values()), projects
 
 
@@ -1536,13 +3906,30 @@ def startup_screen():
         tk.Button(of, text="OPEN", command=open_action).pack(pady=10)
         tk.Button(of, text="BACK", command=lambda:[of.destroy(), frm.pack(expand=True)]).pack()
 
+    def on_shown():
+        startup_mark("welcome screen shown")
+        preload_modules()
+
     root.protocol("WM_DELETE_WINDOW", lambda: exit(0))
+    root.after(0, on_shown)
     root.mainloop()
     return result
 
 
 if __name__ == "__main__":
+    startup_mark("module imported")
+    multiprocessing.freeze_support()
+    cli_args = build_arg_parser().parse_args()
+    if cli_args.migrate_panels:
+        converted, failed, conflicts = migrate_panels()
+        print(f"{converted} panel(s) converted, {failed} failed, {conflicts} left in place (newer than their .panel)")
+        sys.exit(1 if failed else 0)
+    if cli_args.bom or cli_args.bom_all:
+        sys.exit(run_bom_cli(cli_args))
+
+    start_update_check()
     project_info = startup_screen()
+    startup_mark("welcome screen closed")
     root = tk.Tk()
     window_width, window_height = 1200, 700
     screen_width = root.winfo_screenwidth()
@@ -1552,6 +3939,12 @@ if __name__ == "__main__":
     root.geometry(f"{window_width}x{window_height}+{x}+{y}")
     root.minsize(1000, 600)
     app = PanelDesigner(root, project_info["customer"], project_info["project"], project_info["ref"])
+    startup_mark("designer initialised")
+    if cli_args.profile_startup:
+        def report():
+            startup_mark("designer drawn")
+            print(startup_report())
+        root.after_idle(report)
     root.mainloop()
 
 